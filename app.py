@@ -1,39 +1,68 @@
 import os
+import sys
 import time
 import random
 import hmac
+import copy
+import json
+import gzip
+import zlib
+import queue
+import re
+import base64
+import hashlib
+import asyncio
+import datetime
+import unicodedata
 import threading
-from typing import List, Dict, Any, Optional, Tuple
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import List, Dict, Any, Callable, NamedTuple, Optional, Tuple, Union
 
-import requests
+import aiohttp
+import msgspec
 import urllib.parse
 
 from fastf1 import _api as ff1api
+import numpy as np
 import pandas as pd
 
-import json
-import websocket
-import threading
-
 import fastf1
-from fastapi import FastAPI, Header, HTTPException, Query
+from fastapi import FastAPI, Header, HTTPException, Query, Response, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if _frame_recorder is not None:
+        _frame_recorder.start()
+    start_live_timing_task()
+    try:
+        yield
+    finally:
+        await stop_live_timing_task()
+        await stop_replays()
+        await _position_hub.stop()
+        if _frame_recorder is not None:
+            await asyncio.to_thread(_frame_recorder.stop)
 
-app = FastAPI()
 
-latest_positions = []
-latest_updated_at = None
-ws_connected = False
+app = FastAPI(lifespan=lifespan)
 
 # --------------------------------------------------
 # Config
 # --------------------------------------------------
 ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
 DRIVER_CODES_ENV = os.getenv("DRIVER_CODES", "").strip()
+LIVE_TOPICS_ENV = os.getenv("LIVE_TOPICS", "").strip()
 
 SIM_RACE_ID = "test-race-simulation-gp"
 TICK_SECONDS = 5.0
 
+# Set LIVE_TIMING=0 to run without the F1 live timing connection
+LIVE_TIMING_ENABLED = os.getenv("LIVE_TIMING", "1").strip() != "0"
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -116,12 +145,18 @@ RACE_ID_TO_ROUND = {
     "2026-mexico": 20,
     "2026-mexican": 20,
     "2026-brazilian": 21,
+    "2026-sao-paulo": 21,
     "2026-las-vegas": 22,
     "2026-qatar": 23,
     "2026-abu-dhabi": 24,
     SIM_RACE_ID: 0,
 }
 
+# round -> canonical race_id, the first alias listed for that round
+ROUND_TO_RACE_ID: Dict[int, str] = {}
+for _race_id, _round in RACE_ID_TO_ROUND.items():
+    ROUND_TO_RACE_ID.setdefault(_round, _race_id)
+
 # --------------------------------------------------
 # In-memory simulation state
 # --------------------------------------------------
@@ -133,192 +168,1969 @@ _tick_count: int = 0
 _last_grid_loaded_at_utc: Optional[str] = None
 
 
-# --------------------------------------------------
-# Helpers
-# --------------------------------------------------
-def utc_iso_now() -> str:
-    import datetime
-    return datetime.datetime.utcnow().replace(microsecond=0).isoformat() + "Z"
+# --------------------------------------------------
+# Helpers
+# --------------------------------------------------
+def utc_iso_now() -> str:
+    return datetime.datetime.utcnow().replace(microsecond=0).isoformat() + "Z"
+
+
+def utc_iso_from_ts(ts: float) -> str:
+    return datetime.datetime.fromtimestamp(ts, datetime.timezone.utc).replace(tzinfo=None) \
+        .isoformat(timespec="milliseconds") + "Z"
+
+
+def _require_admin_token(x_admin_token: Optional[str]) -> None:
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=500, detail="ADMIN_TOKEN not configured on server")
+
+    if not x_admin_token:
+        raise HTTPException(status_code=401, detail="Missing X-Admin-Token")
+
+    if not hmac.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+def normalize_driver_code(code: Optional[str]) -> Optional[str]:
+    if not code:
+        return None
+    code = str(code).strip().upper()
+    return FASTF1_TO_APP_CODE.get(code, code)
+
+
+def parse_driver_codes_from_env() -> List[str]:
+    if DRIVER_CODES_ENV:
+        parts = [p.strip().upper() for p in DRIVER_CODES_ENV.split(",")]
+        codes: List[str] = []
+        seen = set()
+        for c in parts:
+            if c and c not in seen:
+                seen.add(c)
+                codes.append(c)
+        return codes
+
+    # Fallback: your actual 22-driver list
+    return [
+        "PER", "GAS", "COL", "ALO", "STR", "BOT",
+        "LEC", "HAM", "BEA", "OCO", "PIA", "NOR",
+        "RUS", "LAW", "LIN", "VER", "HAD", "HUL",
+        "BOR", "SAI", "ALB", "ANT",
+    ]
+
+
+
+
+# --------------------------------------------------
+# Live timing position state
+# TimingData only sends the fields that changed, so positions are merged
+# into a persistent store instead of rebuilt from each frame.
+# --------------------------------------------------
+MAX_RACE_POSITIONS = 22
+
+
+class PositionState:
+    """
+    Racing number keyed position store.
+    _slots is indexed by position (index 0 unused), _pos_of maps racing
+    number -> position, so a delta costs O(drivers in the delta) and an
+    overtake is a swap of two slots.
+    """
+
+    def __init__(self, size: int = MAX_RACE_POSITIONS):
+        self._slots: List[Optional[str]] = [None] * (size + 1)
+        self._pos_of: Dict[str, int] = {}
+
+    def reset(self) -> None:
+        self._slots = [None] * len(self._slots)
+        self._pos_of.clear()
+
+    def copy(self) -> "PositionState":
+        other = PositionState.__new__(PositionState)
+        other._slots = list(self._slots)
+        other._pos_of = dict(self._pos_of)
+        return other
+
+    def move(self, drv: str, pos: int) -> bool:
+        if pos < 1:
+            return False
+        if pos >= len(self._slots):
+            self._slots.extend([None] * (pos + 1 - len(self._slots)))
+
+        old = self._pos_of.get(drv)
+        if old == pos:
+            return False
+
+        other = self._slots[pos]
+        self._slots[pos] = drv
+        self._pos_of[drv] = pos
+
+        if old is not None:
+            # Overtake: the displaced car takes the mover's old slot until
+            # its own delta (usually in the same frame) says otherwise.
+            self._slots[old] = other
+            if other is not None:
+                self._pos_of[other] = old
+        elif other is not None:
+            # First sighting of drv; the displaced car has no known slot
+            del self._pos_of[other]
+
+        return True
+
+    def apply_lines(self, lines: Dict[str, Any], line_fallback: bool = False) -> bool:
+        """
+        Merge a TimingData Lines delta, given as plain dicts or decoded
+        TimingLine structs. Returns True if the order changed.
+        With line_fallback, a missing Position falls back to the timing
+        screen Line (used for full snapshots, where every car has one).
+        """
+        changed = False
+        for drv, info in lines.items():
+            if isinstance(info, TimingLine):
+                pos = info.Position
+                if not pos and line_fallback:
+                    pos = info.Line
+            elif isinstance(info, dict):
+                pos = info.get("Position")
+                if not pos and line_fallback:
+                    pos = info.get("Line")
+            else:
+                continue
+
+            if not pos:
+                continue
+
+            try:
+                pos = int(pos)
+            except (TypeError, ValueError):
+                continue
+
+            if self.move(drv, pos):
+                changed = True
+
+        return changed
+
+    def rows(self, drivers: "DriverCodes") -> List[Dict[str, Any]]:
+        rows = []
+        for pos, drv in enumerate(self._slots):
+            if drv is None:
+                continue
+
+            code = drivers.code(drv)
+            if not code:
+                continue
+
+            rows.append({"position": pos, "driver": code})
+        return rows
+
+    def __contains__(self, drv: str) -> bool:
+        return drv in self._pos_of
+
+    def items(self):
+        """
+        (position, racing number) pairs of occupied slots, in order.
+        """
+        for pos, drv in enumerate(self._slots):
+            if drv is not None:
+                yield pos, drv
+
+
+
+# --------------------------------------------------
+# Position history
+# Fixed-capacity ring of every published order: a float64 time column
+# plus an int8 (samples x drivers) position matrix, 0 = no position.
+# --------------------------------------------------
+POSITION_HISTORY_CAPACITY = int(os.getenv("POSITION_HISTORY_CAPACITY", "20000"))
+POSITION_HISTORY_MAX_DRIVERS = 26
+
+
+class PositionHistory:
+    def __init__(self, capacity: int, max_drivers: int = POSITION_HISTORY_MAX_DRIVERS):
+        self.capacity = capacity
+        self.t = np.zeros(capacity, dtype=np.float64)
+        self.pos = np.zeros((capacity, max_drivers), dtype=np.int8)
+        self.head = 0
+        self.count = 0
+        # racing number -> column, assigned on first sighting
+        self.columns: Dict[str, int] = {}
+
+    def append(self, ts: float, items) -> None:
+        row = self.pos[self.head]
+        row[:] = 0
+        for pos, drv in items:
+            col = self.columns.get(drv)
+            if col is None:
+                if len(self.columns) >= self.pos.shape[1] or pos > 127:
+                    continue
+                col = self.columns[drv] = len(self.columns)
+            row[col] = pos
+
+        self.t[self.head] = ts
+        self.head = (self.head + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+
+    def indices_since(self, since: float) -> np.ndarray:
+        """
+        Physical row indices with t > since, oldest first. Rows are appended
+        in time order, so each contiguous part of the ring is sorted and can
+        be binary searched.
+        """
+        if self.count < self.capacity:
+            i = int(np.searchsorted(self.t[:self.count], since, side="right"))
+            return np.arange(i, self.count)
+
+        newer = self.t[:self.head]
+        if newer.size and since >= newer[0]:
+            j = int(np.searchsorted(newer, since, side="right"))
+            return np.arange(j, self.head)
+
+        older = self.t[self.head:]
+        j = int(np.searchsorted(older, since, side="right"))
+        return np.concatenate((np.arange(self.head + j, self.capacity), np.arange(0, self.head)))
+
+
+
+# --------------------------------------------------
+# Feed lag
+# Every update is applied under an ingest context: when its frame was
+# received locally and the upstream timestamp the feed stamped on it.
+#   network lag    = local receive time - upstream timestamp
+#   processing lag = order published - frame received
+# (network lag includes any clock skew between us and the feed).
+# --------------------------------------------------
+LAG_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000)
+
+
+class LagHistogram:
+    """
+    Rolling window of the most recent samples (ms), bucketed on read.
+    """
+
+    def __init__(self, window: int = 4096):
+        self._samples: deque = deque(maxlen=window)
+
+    def add(self, ms: float) -> None:
+        self._samples.append(ms)
+
+    def snapshot(self) -> Dict[str, Any]:
+        arr = np.fromiter(self._samples, dtype=np.float64, count=len(self._samples))
+        if arr.size == 0:
+            return {"samples": 0, "p50_ms": None, "p90_ms": None, "p99_ms": None, "max_ms": None, "buckets": {}}
+
+        p50, p90, p99 = np.percentile(arr, [50, 90, 99])
+        counts = np.bincount(np.searchsorted(LAG_BUCKETS_MS, arr, side="left"),
+                             minlength=len(LAG_BUCKETS_MS) + 1)
+        labels = [f"le_{b}ms" for b in LAG_BUCKETS_MS] + [f"gt_{LAG_BUCKETS_MS[-1]}ms"]
+        return {
+            "samples": int(arr.size),
+            "p50_ms": round(float(p50), 3),
+            "p90_ms": round(float(p90), 3),
+            "p99_ms": round(float(p99), 3),
+            "max_ms": round(float(arr.max()), 3),
+            "buckets": {label: int(c) for label, c in zip(labels, counts) if c},
+        }
+
+
+class PublishedPositions(NamedTuple):
+    """
+    Immutable order as last published by a session; replaced, never mutated.
+    body is the /positions response for this version, encoded once here so
+    serving it is a pointer read.
+    """
+    version: int
+    order: List[Dict[str, Any]]
+    updated_at: Optional[str]
+    upstream_at: Optional[str]
+    body: bytes
+    etag: str
+    # Content-Encoding -> compressed body, filled on first request
+    variants: Dict[str, bytes]
+
+
+_NOTHING_PUBLISHED = PublishedPositions(0, [], None, None, b"", "", {})
+
+_json_encoder = msgspec.json.Encoder()
+
+# /positions serves the top of the order only
+POSITIONS_TOP_N = 8
+# Published versions kept per session for /positions/stream Last-Event-ID resume
+POSITIONS_STREAM_BUFFER = int(os.getenv("POSITIONS_STREAM_BUFFER", "256"))
+# Published versions whose moves are kept for /positions?delta_from=
+POSITIONS_DELTA_LOG = int(os.getenv("POSITIONS_DELTA_LOG", "512"))
+
+# (driver code, old position, new position); None = outside the served top
+OrderMove = Tuple[str, Optional[int], Optional[int]]
+
+
+def order_moves(old: List[Dict[str, Any]], new: List[Dict[str, Any]]) -> Tuple[OrderMove, ...]:
+    before = {row["driver"]: row["position"] for row in old}
+    moves = []
+    for row in new:
+        pos = before.pop(row["driver"], None)
+        if pos != row["position"]:
+            moves.append((row["driver"], pos, row["position"]))
+    for drv, pos in before.items():
+        moves.append((drv, pos, None))
+    return tuple(moves)
+
+
+def sse_event(event_id: str, data: bytes) -> bytes:
+    return b"id: %s\nevent: positions\ndata: %s\n\n" % (event_id.encode("ascii"), data)
+
+
+def publish_positions(session: "LiveSession") -> None:
+    order = session.positions.rows(session.drivers)
+    previous = session.published
+    version = previous.version + 1
+    updated_at = utc_iso_now()
+    upstream_ts = session.upstream_ts
+    upstream_at = utc_iso_from_ts(upstream_ts) if upstream_ts else None
+    cursor = session.cursor(version)
+    body = _json_encoder.encode({
+        "status": "live" if order else "not_live",
+        "race_id": session.race_id,
+        "session_type": session.session_type,
+        "version": version,
+        "cursor": cursor,
+        "updated_at": updated_at,
+        "upstream_at": upstream_at,
+        "order": order[:POSITIONS_TOP_N],
+    })
+    # One attribute store: readers on other threads see the old or the new
+    # snapshot, never a mix
+    etag = f'"{cursor}"'
+    session.published = PublishedPositions(version, order, updated_at, upstream_at, body, etag, {})
+    session.stream_events.append((version, sse_event(cursor, body)))
+    session.moves_log.append((version, order_moves(previous.order[:POSITIONS_TOP_N], order[:POSITIONS_TOP_N])))
+    session.history.append(time.time(), session.positions.items())
+
+    if session.received_ns:
+        session.processing_lag.add((time.perf_counter_ns() - session.received_ns) / 1e6)
+
+    session.notify()
+
+
+def process_timing_data(session: "LiveSession", data):
+    lines = data.Lines if isinstance(data, TimingDataDelta) else data.get("Lines")
+    if not lines:
+        return
+
+    if not session.positions.apply_lines(lines):
+        return
+
+    publish_positions(session)
+
+
+def apply_timing_snapshot(session: "LiveSession", data):
+    """
+    Full TimingData state (Subscribe response). The order is rebuilt rather
+    than merged, so cars that dropped out while we were away do not linger.
+    """
+    lines = data.Lines if isinstance(data, TimingDataDelta) else data.get("Lines")
+
+    session.positions.reset()
+    session.positions.apply_lines(lines or {}, line_fallback=True)
+    publish_positions(session)
+
+
+# --------------------------------------------------
+# SignalR frame decoding
+# msgspec schemas for the hub envelope and the TimingData Lines we use.
+# Hub message arguments stay msgspec.Raw until the method is "feed" and
+# the topic is one we subscribed to, so keepalives, other hub calls and
+# unwanted topics never have their body parsed. Fields not named in a
+# schema are skipped without being materialised.
+# --------------------------------------------------
+class TimingLine(msgspec.Struct):
+    Position: Union[str, int, None] = None
+    Line: Union[int, str, None] = None
+
+
+class TimingDataDelta(msgspec.Struct):
+    Lines: Dict[str, TimingLine] = {}
+
+
+class HubMessage(msgspec.Struct):
+    M: str = ""
+    A: List[msgspec.Raw] = []
+
+
+class SignalRFrame(msgspec.Struct):
+    C: Optional[str] = None
+    G: Optional[str] = None
+    I: Union[str, int, None] = None
+    R: msgspec.Raw = msgspec.Raw()
+    M: List[HubMessage] = []
+
+
+_frame_decoder = msgspec.json.Decoder(SignalRFrame)
+_snapshot_decoder = msgspec.json.Decoder(Dict[str, msgspec.Raw])
+_str_decoder = msgspec.json.Decoder(str)
+_any_decoder = msgspec.json.Decoder()
+
+# Typed decoders per topic; topics not listed decode to plain dicts/lists
+TOPIC_DECODERS: Dict[str, msgspec.json.Decoder] = {
+    "TimingData": msgspec.json.Decoder(TimingDataDelta),
+    "CarData.z": _str_decoder,
+    "Position.z": _str_decoder,
+}
+
+
+def decode_topic_data(topic: str, raw: msgspec.Raw) -> Any:
+    decoder = TOPIC_DECODERS.get(topic)
+    if decoder is not None:
+        try:
+            return decoder.decode(raw)
+        except msgspec.ValidationError:
+            # Valid JSON in an unexpected shape; let the handler see it as-is
+            pass
+    return _any_decoder.decode(raw)
+
+
+# --------------------------------------------------
+# Live topic dispatch
+# Every subscribed topic has one decoder registered in TOPIC_HANDLERS.
+# Handlers get (session, data, is_snapshot): the Subscribe response carries
+# full state, feed messages carry deltas. All state a handler touches
+# lives on the LiveSession it is given.
+# --------------------------------------------------
+DEFAULT_LIVE_TOPICS = [
+    "TimingData",
+    "DriverList",
+    "SessionInfo",
+    "SessionStatus",
+    "LapCount",
+    "TimingAppData",
+    "RaceControlMessages",
+    "CarData.z",
+    "Position.z",
+]
+
+# A handler call slower than this is counted as slow in /live/metrics
+SLOW_TOPIC_HANDLER_MS = 5.0
+
+TopicHandler = Callable[["LiveSession", Any, bool], None]
+TOPIC_HANDLERS: Dict[str, TopicHandler] = {}
+
+
+def parse_live_topics_from_env() -> List[str]:
+    if not LIVE_TOPICS_ENV:
+        return DEFAULT_LIVE_TOPICS.copy()
+
+    topics: List[str] = []
+    for t in LIVE_TOPICS_ENV.split(","):
+        t = t.strip()
+        if t and t not in topics:
+            topics.append(t)
+
+    # Positions are the point of the feed; never run without them
+    if "TimingData" not in topics:
+        topics.insert(0, "TimingData")
+    return topics
+
+
+LIVE_TOPICS = parse_live_topics_from_env()
+
+
+def topic_handler(*topics: str):
+    def register(fn: TopicHandler) -> TopicHandler:
+        for t in topics:
+            TOPIC_HANDLERS[t] = fn
+        return fn
+    return register
+
+
+class TopicStats:
+    __slots__ = ("count", "total_ns", "max_ns", "slow", "errors")
+
+    def __init__(self):
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.slow = 0
+        self.errors = 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total_ns / self.count / 1e6, 4) if self.count else None,
+            "max_ms": round(self.max_ns / 1e6, 4),
+            "total_ms": round(self.total_ns / 1e6, 3),
+            "slow": self.slow,
+            "errors": self.errors,
+        }
+
+
+def dispatch_topic(session: "LiveSession", topic: str, data: Any, is_snapshot: bool = False) -> None:
+    handler = TOPIC_HANDLERS.get(topic)
+    if handler is None:
+        return
+
+    stats = session.topic_stats.get(topic)
+    if stats is None:
+        stats = session.topic_stats[topic] = TopicStats()
+
+    t0 = time.perf_counter_ns()
+    try:
+        handler(session, data, is_snapshot)
+    except Exception as e:
+        # One broken decoder must not take the rest of the frame with it
+        stats.errors += 1
+        print(f"Live topic {topic} handler failed:", repr(e))
+    elapsed = time.perf_counter_ns() - t0
+
+    stats.count += 1
+    stats.total_ns += elapsed
+    if elapsed > stats.max_ns:
+        stats.max_ns = elapsed
+    if elapsed > SLOW_TOPIC_HANDLER_MS * 1e6:
+        stats.slow += 1
+
+
+def merge_topic_delta(dst: Any, delta: Any) -> Any:
+    """
+    F1 feed delta semantics: dicts merge recursively and lists are patched
+    by index, e.g. {"Stints": {"2": {...}}}. Anything else replaces.
+    """
+    if isinstance(delta, dict):
+        if isinstance(dst, dict):
+            for key, value in delta.items():
+                dst[key] = merge_topic_delta(dst.get(key), value)
+            return dst
+
+        if isinstance(dst, list):
+            for key, value in delta.items():
+                try:
+                    i = int(key)
+                except (TypeError, ValueError):
+                    continue
+                if i < len(dst):
+                    dst[i] = merge_topic_delta(dst[i], value)
+                elif i == len(dst):
+                    dst.append(value)
+            return dst
+
+    return delta
+
+
+def inflate_z_payload(data: str) -> bytes:
+    """
+    .z topics are base64 encoded raw deflate streams of JSON.
+    """
+    return zlib.decompress(base64.b64decode(data), -zlib.MAX_WBITS)
+
+
+def decode_z_payload(data: str) -> Any:
+    return _any_decoder.decode(inflate_z_payload(data))
+
+
+@topic_handler("TimingData")
+def _on_timing_data(session, data, is_snapshot):
+    if not isinstance(data, (TimingDataDelta, dict)):
+        return
+    if is_snapshot:
+        apply_timing_snapshot(session, data)
+    else:
+        process_timing_data(session, data)
+
+
+def _state_topic_handler(topic: str) -> TopicHandler:
+    """
+    Decoder for topics we only keep the latest merged state of.
+    """
+    def handler(session, data, is_snapshot):
+        topics = session.topics
+        if is_snapshot or topic not in topics:
+            topics[topic] = data
+        else:
+            topics[topic] = merge_topic_delta(topics[topic], data)
+    return handler
+
+
+for _topic in ("SessionInfo", "SessionStatus", "LapCount",
+               "TimingAppData", "RaceControlMessages"):
+    topic_handler(_topic)(_state_topic_handler(_topic))
+
+
+_store_driver_list = _state_topic_handler("DriverList")
+
+
+@topic_handler("DriverList")
+def _on_driver_list(session, data, is_snapshot):
+    _store_driver_list(session, data, is_snapshot)
+    if not isinstance(data, dict):
+        return
+
+    changed = session.drivers.update(data)
+    # A car that was on track under an unknown number becomes visible now
+    if any(num in session.positions for num in changed):
+        publish_positions(session)
+
+
+@topic_handler("Position.z")
+def _on_position_z(session, data, is_snapshot):
+    decoded = decode_z_payload(data)
+    samples = decoded.get("Position") if isinstance(decoded, dict) else None
+    if samples:
+        # Keep only the newest sample of the batch
+        session.topics["Position"] = samples[-1]
+
+
+def parse_feed_utc(value: Optional[str]) -> Optional[float]:
+    """
+    Feed timestamps ("2026-03-08T05:04:03.1234567Z") -> epoch seconds.
+    """
+    if not value:
+        return None
+    try:
+        dt = datetime.datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=datetime.timezone.utc)
+    return dt.timestamp()
+
+
+# --------------------------------------------------
+# Live car telemetry (CarData.z)
+# Fixed-size NumPy ring per racing number; samples are written straight
+# into the arrays, never kept as Python objects.
+# --------------------------------------------------
+TELEMETRY_BUFFER_SECONDS = float(os.getenv("TELEMETRY_BUFFER_SECONDS", "120"))
+# CarData runs at ~4 Hz per car; leave headroom for bursty batches
+TELEMETRY_SAMPLES_PER_SECOND = 5
+
+# Output column -> CarData channel id
+TELEMETRY_CHANNELS = [
+    ("speed", "2"),
+    ("rpm", "0"),
+    ("gear", "3"),
+    ("throttle", "4"),
+    ("brake", "5"),
+]
+
+MAX_RACING_NUMBER = 99
+
+# CarData schema generated from TELEMETRY_CHANNELS: one attribute per output
+# column, in column order, read from its channel id. Other channels are
+# skipped by the decoder.
+TELEMETRY_FIELDS = tuple(name for name, _ in TELEMETRY_CHANNELS)
+CarChannels = msgspec.defstruct(
+    "CarChannels",
+    [(name, int, msgspec.field(default=0, name=channel)) for name, channel in TELEMETRY_CHANNELS],
+)
+
+
+class CarSample(msgspec.Struct):
+    Channels: CarChannels = msgspec.field(default_factory=CarChannels)
+
+
+class CarDataEntry(msgspec.Struct):
+    Utc: Optional[str] = None
+    Cars: Dict[int, CarSample] = {}
+
+
+class CarDataBatch(msgspec.Struct):
+    Entries: List[CarDataEntry] = []
+
+
+_car_data_decoder = msgspec.json.Decoder(CarDataBatch)
+
+
+class TelemetryBuffer:
+    """
+    Row r holds racing number r. Memory is fixed at construction:
+    (numbers x capacity) timestamps plus (numbers x capacity x channels) int16.
+    """
+
+    def __init__(self, capacity: int):
+        rows = MAX_RACING_NUMBER + 1
+        self.capacity = capacity
+        self.t = np.zeros((rows, capacity), dtype=np.float64)
+        self.values = np.zeros((rows, capacity, len(TELEMETRY_CHANNELS)), dtype=np.int16)
+        self.head = np.zeros(rows, dtype=np.int64)
+        self.count = np.zeros(rows, dtype=np.int64)
+        self.latest_t = 0.0
+
+    def reset(self) -> None:
+        self.head[:] = 0
+        self.count[:] = 0
+        self.latest_t = 0.0
+
+    def write_entries(self, entries: List[CarDataEntry]) -> int:
+        written = 0
+        cap = self.capacity
+        t, values, head, count = self.t, self.values, self.head, self.count
+        columns = tuple(enumerate(TELEMETRY_FIELDS))
+
+        for entry in entries:
+            ts = parse_feed_utc(entry.Utc)
+            cars = entry.Cars
+            if ts is None or not cars:
+                continue
+
+            for row, car in cars.items():
+                if not 0 <= row <= MAX_RACING_NUMBER:
+                    continue
+
+                ch = car.Channels
+                i = head[row]
+                t[row, i] = ts
+                sample = values[row, i]
+                for c, name in columns:
+                    sample[c] = getattr(ch, name)
+                head[row] = (i + 1) % cap
+                if count[row] < cap:
+                    count[row] += 1
+                written += 1
+
+            if ts > self.latest_t:
+                self.latest_t = ts
+
+        return written
+
+    def window(self, seconds: float, numbers: Optional[List[int]] = None) -> Dict[int, Dict[str, Any]]:
+        """
+        Samples of the last `seconds` of feed time, oldest first, per number.
+        """
+        cutoff = self.latest_t - seconds
+        rows = numbers if numbers is not None else np.flatnonzero(self.count).tolist()
+
+        out: Dict[int, Dict[str, Any]] = {}
+        for row in rows:
+            n = int(self.count[row])
+            if n == 0:
+                continue
+
+            idx = (int(self.head[row]) - n + np.arange(n)) % self.capacity
+            ts = self.t[row, idx]
+            keep = idx[ts >= cutoff]
+            if keep.size == 0:
+                continue
+
+            cols = self.values[row, keep]
+            series: Dict[str, Any] = {"t": self.t[row, keep].tolist()}
+            for c, (name, _) in enumerate(TELEMETRY_CHANNELS):
+                series[name] = cols[:, c].tolist()
+            out[row] = series
+
+        return out
+
+
+TELEMETRY_BUFFER_SAMPLES = int(TELEMETRY_BUFFER_SECONDS * TELEMETRY_SAMPLES_PER_SECOND)
+
+
+@topic_handler("CarData.z")
+def _on_car_data_z(session, data, is_snapshot):
+    entries = _car_data_decoder.decode(inflate_z_payload(data)).Entries
+    if entries:
+        session.telemetry.write_entries(entries)
+
+
+TopicUpdate = Tuple[str, Any, bool]
+
+# Snapshot topics applied before the rest, so the order published from the
+# TimingData snapshot already knows the session and driver list
+SNAPSHOT_FIRST_TOPICS = ("SessionInfo", "DriverList")
+
+
+def snapshot_updates(snapshot: Dict[str, Any]) -> List[TopicUpdate]:
+    """
+    The Subscribe response (R) holds the full current state of each topic.
+    Values may still be msgspec.Raw; only subscribed topics are decoded.
+    """
+    first = [t for t in SNAPSHOT_FIRST_TOPICS if t in snapshot]
+    if first:
+        snapshot = {**{t: snapshot[t] for t in first}, **snapshot}
+
+    updates = []
+    for topic, data in snapshot.items():
+        if topic not in SUBSCRIBED_TOPICS:
+            continue
+        if isinstance(data, msgspec.Raw):
+            try:
+                data = decode_topic_data(topic, data)
+            except msgspec.DecodeError:
+                continue
+        updates.append((topic, data, True))
+    return updates
+
+
+def apply_subscribe_snapshot(session: "LiveSession", snapshot: Dict[str, Any]) -> None:
+    for topic, data, is_snapshot in snapshot_updates(snapshot):
+        dispatch_topic(session, topic, data, is_snapshot)
+
+
+# Topics that are both subscribed and have a decoder registered
+SUBSCRIBED_TOPICS = frozenset(t for t in LIVE_TOPICS if t in TOPIC_HANDLERS)
+
+
+# --------------------------------------------------
+# Racing number -> app driver code
+# Each LiveSession has its own table, so a replay of another season can't
+# rename the live cars: a list indexed by racing number, seeded from
+# DEFAULT_DRIVER_NUMBERS and refreshed from that session's DriverList.
+# Codes are normalised through FASTF1_TO_APP_CODE and interned once when
+# stored, so the per-frame lookup is a list index with no allocation.
+# --------------------------------------------------
+DEFAULT_DRIVER_NUMBERS = {
+    "1": "VER",
+    "4": "NOR",
+    "5": "BOR",
+    "6": "HAD",
+    "10": "GAS",
+    "11": "PER",
+    "12": "ANT",
+    "14": "ALO",
+    "16": "LEC",
+    "18": "STR",
+    "23": "ALB",
+    "27": "HUL",
+    "30": "LAW",
+    "31": "OCO",
+    "41": "LIN",
+    "43": "COL",
+    "44": "HAM",
+    "55": "SAI",
+    "63": "RUS",
+    "77": "BOT",
+    "81": "PIA",
+    "87": "BEA",
+}
+
+def _racing_number_index(num) -> Optional[int]:
+    try:
+        i = int(num)
+    except (TypeError, ValueError):
+        return None
+    return i if 0 <= i <= MAX_RACING_NUMBER else None
+
+
+class DriverCodes:
+    __slots__ = ("_codes",)
+
+    def __init__(self):
+        self._codes: List[Optional[str]] = list(_DEFAULT_DRIVER_CODES)
+
+    def set(self, num, code: Optional[str]) -> bool:
+        """
+        Store the app code for a racing number. Returns True if it changed.
+        """
+        i = _racing_number_index(num)
+        code = normalize_driver_code(code)
+        if i is None or not code:
+            return False
+
+        code = sys.intern(code)
+        if self._codes[i] is code:
+            return False
+        self._codes[i] = code
+        return True
+
+    def update(self, driver_list: Dict[str, Any]) -> List[str]:
+        """
+        Apply a DriverList snapshot or delta; entries without a Tla (e.g. Line
+        only updates) are left alone. Returns the racing numbers that changed.
+        """
+        changed = []
+        for num, info in driver_list.items():
+            if isinstance(info, dict) and self.set(num, info.get("Tla")):
+                changed.append(num)
+        return changed
+
+    def copy(self) -> "DriverCodes":
+        other = DriverCodes.__new__(DriverCodes)
+        other._codes = list(self._codes)
+        return other
+
+    def code(self, num) -> Optional[str]:
+        try:
+            return self._codes[int(num)]
+        except (TypeError, ValueError, IndexError):
+            return None
+
+
+_DEFAULT_DRIVER_CODES: List[Optional[str]] = [None] * (MAX_RACING_NUMBER + 1)
+for _num, _code in DEFAULT_DRIVER_NUMBERS.items():
+    _DEFAULT_DRIVER_CODES[int(_num)] = sys.intern(normalize_driver_code(_code))
+
+
+# --------------------------------------------------
+# Live sessions
+# One LiveSession per followed session (the live feed, or a replay),
+# registered by race_id. Handlers only ever write to the session they are
+# given, so a replay cannot disturb the live order and vice versa.
+# Readers take session.published, which is swapped whole on every
+# publish, so /positions needs no lock.
+# The live feed names its own session: each SessionInfo it carries is
+# resolved to (race_id, session type), and a new identity opens a new
+# session. Every other update goes to the current one (_live_session).
+# --------------------------------------------------
+# Pin the live feed to one race_id instead of resolving it from SessionInfo
+LIVE_RACE_ID = os.getenv("LIVE_RACE_ID", "").strip()
+# race_id of a live session that SessionInfo has not (or could not) name
+UNRESOLVED_RACE_ID = "live"
+MAX_LIVE_SESSIONS = int(os.getenv("MAX_LIVE_SESSIONS", "8"))
+
+# SessionInfo Name -> FastF1 session identifier
+SESSION_NAME_TO_TYPE = {
+    "Practice 1": "FP1",
+    "Practice 2": "FP2",
+    "Practice 3": "FP3",
+    "Sprint Qualifying": "SQ",
+    "Sprint Shootout": "SQ",
+    "Sprint": "S",
+    "Qualifying": "Q",
+    "Race": "R",
+}
+
+
+class LiveSession:
+    def __init__(self, race_id: str, source: str = "live", session_type: Optional[str] = None):
+        self.race_id = race_id
+        self.session_type = session_type
+        self.source = source
+        self.created_at = utc_iso_now()
+        # Versions restart with every session (and process), so ETags carry
+        # a per-instance prefix as well
+        self.etag_prefix = os.urandom(6).hex()
+
+        self.drivers = DriverCodes()
+        self.positions = PositionState()
+        self.history = PositionHistory(POSITION_HISTORY_CAPACITY)
+        self.telemetry = TelemetryBuffer(TELEMETRY_BUFFER_SAMPLES)
+        # Latest merged state of topics that are kept as-is (DriverList, SessionInfo, ...)
+        self.topics: Dict[str, Any] = {}
+        self.published = _NOTHING_PUBLISHED
+        # (unix second, body) of the last not_live /positions response
+        self.not_live_body: Tuple[int, bytes] = (0, b"")
+        # (version, SSE event) of recent publishes
+        self.stream_events: deque = deque(maxlen=POSITIONS_STREAM_BUFFER)
+        # (version, moves in the served top) of recent publishes, and the
+        # delta bodies built for the current version, by delta_from
+        self.moves_log: deque = deque(maxlen=POSITIONS_DELTA_LOG)
+        self.delta_bodies: Dict[int, bytes] = {}
+        self.delta_bodies_version = 0
+        self._changed = asyncio.Event()
+
+        self.topic_stats: Dict[str, TopicStats] = {}
+        self.network_lag = LagHistogram()
+        self.processing_lag = LagHistogram()
+        # Ingest context of the update being applied (see Feed lag)
+        self.received_ns = 0
+        self.upstream_ts: Optional[float] = None
+
+    def cursor(self, version: int) -> str:
+        """
+        "<etag_prefix>.<version>": names a version of this session only;
+        the token in ETags, SSE event ids and delta_from.
+        """
+        return f"{self.etag_prefix}.{version}"
+
+    def version_of(self, cursor: Optional[str]) -> Optional[int]:
+        """
+        Version a cursor (or ETag, of any encoding) names, None if it is
+        from another session.
+        """
+        if not cursor:
+            return None
+        cursor = cursor.strip()
+        if cursor.startswith("W/"):
+            cursor = cursor[2:]
+        prefix, _, version = cursor.strip('"').partition(".")
+        version = version.partition("-")[0]
+        if prefix != self.etag_prefix or not version.isdigit():
+            return None
+        return int(version)
+
+    def set_ingest_context(self, received_ns: int, upstream_ts: Optional[float]) -> None:
+        self.received_ns = received_ns
+        self.upstream_ts = upstream_ts
+
+    def changed(self) -> asyncio.Event:
+        """
+        Set on the next publish (or when the session stops being the live
+        one). Take it before reading published, then wait on it.
+        """
+        return self._changed
+
+    def notify(self) -> None:
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    def snapshot(self) -> Dict[str, Any]:
+        published = self.published
+        return {
+            "source": self.source,
+            "session_type": self.session_type,
+            "created_at": self.created_at,
+            "version": published.version,
+            "updated_at": published.updated_at,
+            "topics": {topic: stats.snapshot() for topic, stats in self.topic_stats.items()},
+            "lag": {
+                "network": self.network_lag.snapshot(),
+                "processing": self.processing_lag.snapshot(),
+                "latest_upstream_at": published.upstream_at,
+            },
+        }
+
+
+def canonical_race_id(race_id: str) -> str:
+    """
+    Any alias in RACE_ID_TO_ROUND -> the canonical id of its round; other
+    ids (replays, unresolved) are returned as-is.
+    """
+    rid = race_id.strip()
+    round_no = RACE_ID_TO_ROUND.get(rid)
+    return ROUND_TO_RACE_ID[round_no] if round_no is not None else rid
+
+
+def _slug(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii")
+    return "-".join(re.findall(r"[a-z0-9]+", text.lower()))
+
+
+def resolve_session_identity(info: Dict[str, Any]) -> Tuple[Optional[str], Optional[str]]:
+    """
+    SessionInfo -> (canonical race_id, session type). The meeting name is
+    matched against RACE_ID_TO_ROUND, dropping trailing words until an alias
+    fits ("Mexico City Grand Prix" -> 2026-mexico). Sessions that are not
+    part of a race weekend (testing) resolve to no race_id.
+    """
+    name = info.get("Name")
+    session_type = SESSION_NAME_TO_TYPE.get(name, name)
+    if name not in SESSION_NAME_TO_TYPE:
+        return None, session_type
+
+    meeting = info.get("Meeting")
+    meeting_name = meeting.get("Name") if isinstance(meeting, dict) else None
+    year = str(info.get("Path") or info.get("StartDate") or "")[:4]
+    if not meeting_name or not year.isdigit():
+        return None, session_type
+
+    words = _slug(meeting_name).replace("grand-prix", "").strip("-").split("-")
+    for n in range(len(words), 0, -1):
+        round_no = RACE_ID_TO_ROUND.get(f"{year}-{'-'.join(words[:n])}")
+        if round_no is not None:
+            return ROUND_TO_RACE_ID[round_no], session_type
+    return None, session_type
+
+
+_sessions: Dict[str, LiveSession] = {}
+
+
+def open_session(race_id: str, source: str = "live", session_type: Optional[str] = None) -> LiveSession:
+    """
+    Register a fresh session under race_id, replacing any previous one.
+    When the registry is full the oldest idle session is forgotten. If
+    every session is busy, a new replay is refused (RuntimeError), while
+    the live feed stops the oldest replay to make room: it must always
+    get its session.
+    """
+    race_id = canonical_race_id(race_id)
+    replaced = _sessions.pop(race_id, None)
+    if replaced is not None:
+        # Long-polls and streams parked on it move to the new session
+        replaced.notify()
+
+    if len(_sessions) >= MAX_LIVE_SESSIONS:
+        candidates = [rid for rid, session in _sessions.items() if session is not _live_session]
+        idle = [rid for rid in candidates if rid not in _replay_tasks or _replay_tasks[rid].done()]
+        if idle:
+            victim = idle[0]
+        elif source == "live":
+            victim = candidates[0] if candidates else next(iter(_sessions))
+        else:
+            raise RuntimeError(f"Too many live sessions (max {MAX_LIVE_SESSIONS})")
+
+        replay = _replay_tasks.pop(victim, None)
+        if replay is not None:
+            replay.cancel()
+            print(f"Replay {victim} stopped to make room for the live session")
+        _sessions.pop(victim).notify()
+
+    session = _sessions[race_id] = LiveSession(race_id, source, session_type)
+    return session
+
+
+def get_session(race_id: Optional[str] = None) -> Optional[LiveSession]:
+    if race_id is None:
+        return _live_session
+    return _sessions.get(canonical_race_id(race_id))
+
+
+def route_live_session(info: Any) -> LiveSession:
+    """
+    Session a live SessionInfo update belongs to, switching _live_session
+    when it names a different session. Deltas that do not carry the
+    session's name or meeting keep the current one.
+    """
+    global _live_session
+
+    current = _live_session
+    if LIVE_RACE_ID or not isinstance(info, dict) or "Name" not in info or "Meeting" not in info:
+        return current
+
+    race_id, session_type = resolve_session_identity(info)
+    race_id = race_id or UNRESOLVED_RACE_ID
+    if race_id == current.race_id and session_type == current.session_type:
+        return current
+
+    # The live feed owns its race_id; stop any replay that was using it
+    replay = _replay_tasks.pop(race_id, None)
+    if replay is not None:
+        replay.cancel()
+    # Nothing was ever published from a session we could not name yet
+    if not current.published.version and _sessions.get(current.race_id) is current:
+        del _sessions[current.race_id]
+
+    print(f"Live session: {race_id} {session_type or ''}".rstrip())
+    _live_session = open_session(race_id, session_type=session_type)
+    # No snapshot follows a SessionInfo switch, only deltas: they apply to
+    # the order and driver list the feed had, so carry those over
+    _live_session.positions = current.positions.copy()
+    _live_session.drivers = current.drivers.copy()
+    if "DriverList" in current.topics:
+        _live_session.topics["DriverList"] = copy.deepcopy(current.topics["DriverList"])
+    # Wake streams following the live session so they move over
+    current.notify()
+    return _live_session
+
+
+# Session the live feed is applied to
+_live_session = open_session(LIVE_RACE_ID or UNRESOLVED_RACE_ID)
+
+# --------------------------------------------------
+# Raw frame recorder
+# Optional append-only log of every frame received from the live socket,
+# for reproducing load and bugs later. Records are
+#   "<receive unix time>\t<payload bytes>\n<payload>\n"
+# in gzip segments rotated by size and age. A bounded queue feeds a writer
+# thread, so disk latency never reaches the socket; when it is full,
+# frames are dropped and counted.
+# --------------------------------------------------
+FRAME_LOG_DIR = os.getenv("FRAME_LOG_DIR", "").strip()
+FRAME_LOG_SEGMENT_BYTES = int(os.getenv("FRAME_LOG_SEGMENT_BYTES", str(64 * 1024 * 1024)))
+FRAME_LOG_SEGMENT_SECONDS = float(os.getenv("FRAME_LOG_SEGMENT_SECONDS", "3600"))
+FRAME_LOG_QUEUE_SIZE = int(os.getenv("FRAME_LOG_QUEUE_SIZE", "10000"))
+
+
+class FrameRecorder:
+    def __init__(self, directory: str, segment_bytes: int = FRAME_LOG_SEGMENT_BYTES,
+                 segment_seconds: float = FRAME_LOG_SEGMENT_SECONDS,
+                 queue_size: int = FRAME_LOG_QUEUE_SIZE):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.segment_seconds = segment_seconds
+        self._queue: "queue.Queue" = queue.Queue(maxsize=queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._seq = 0
+
+        self.recorded = 0
+        self.dropped = 0
+        self.bytes_written = 0
+        self.segment_path: Optional[str] = None
+
+    def start(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="frame-recorder", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        if self._thread is None:
+            return
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+        self._thread = None
+
+    def record(self, message: str) -> None:
+        try:
+            self._queue.put_nowait((time.time(), message))
+        except queue.Full:
+            self.dropped += 1
+
+    def _open_segment(self):
+        self._seq += 1
+        stamp = time.strftime("%Y%m%dT%H%M%SZ", time.gmtime())
+        self.segment_path = os.path.join(self.directory, f"frames-{stamp}-{self._seq:04d}.log.gz")
+        return gzip.open(self.segment_path, "ab", compresslevel=6)
+
+    def _run(self) -> None:
+        out = None
+        opened_at = 0.0
+        segment_size = 0
+        last_flush = time.monotonic()
+
+        try:
+            while True:
+                try:
+                    item = self._queue.get(timeout=1.0)
+                except queue.Empty:
+                    item = False
+
+                now = time.monotonic()
+                if item is None:
+                    break
+
+                if item:
+                    if out is None or segment_size >= self.segment_bytes \
+                            or now - opened_at >= self.segment_seconds:
+                        if out is not None:
+                            out.close()
+                        out = self._open_segment()
+                        opened_at = now
+                        segment_size = 0
+
+                    ts, message = item
+                    payload = message.encode("utf-8")
+                    record = b"%.6f\t%d\n" % (ts, len(payload)) + payload + b"\n"
+                    out.write(record)
+                    segment_size += len(record)
+                    self.bytes_written += len(record)
+                    self.recorded += 1
+
+                # Keep at most ~1 s of frames in gzip's buffer
+                if out is not None and now - last_flush >= 1.0 and self._queue.empty():
+                    out.flush()
+                    last_flush = now
+        except Exception as e:
+            print("Frame recorder stopped:", repr(e))
+        finally:
+            if out is not None:
+                out.close()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "recorded": self.recorded,
+            "dropped": self.dropped,
+            "queued": self._queue.qsize(),
+            "bytes_written": self.bytes_written,
+            "segment": self.segment_path,
+        }
+
+
+def iter_frame_log(path: str):
+    """
+    Yield (receive unix time, raw message) from one segment or, for a
+    directory, from all its segments in recording order. The segment the
+    recorder is writing right now is left out of a directory read.
+    """
+    if os.path.isdir(path):
+        active = _frame_recorder.segment_path if _frame_recorder is not None else None
+        files = sorted(
+            os.path.join(path, f) for f in os.listdir(path)
+            if f.startswith("frames-") and f.endswith(".log.gz")
+        )
+        if active is not None:
+            active = os.path.abspath(active)
+            files = [f for f in files if os.path.abspath(f) != active]
+    else:
+        files = [path]
+
+    for fname in files:
+        with gzip.open(fname, "rb") as f:
+            # A segment that was not closed cleanly (still being written, or
+            # left by a crash) has a torn tail: keep what is readable of it
+            try:
+                while True:
+                    header = f.readline()
+                    if not header:
+                        break
+                    try:
+                        ts, size = header.split(b"\t")
+                        ts, size = float(ts), int(size)
+                    except ValueError:
+                        break
+                    payload = f.read(size)
+                    if len(payload) < size:
+                        break
+                    f.read(1)
+                    yield ts, payload.decode("utf-8")
+            except (EOFError, gzip.BadGzipFile, zlib.error):
+                pass
+
+
+_frame_recorder: Optional[FrameRecorder] = FrameRecorder(FRAME_LOG_DIR) if FRAME_LOG_DIR else None
+
+
+# --------------------------------------------------
+# F1 live timing client (SignalR over websocket)
+# Runs as an asyncio task on the app's own event loop; the FastAPI
+# lifespan starts it on startup and cancels it on shutdown.
+# --------------------------------------------------
+# Point F1_LIVE_BASE_URL at bench/signalr_standin.py for local load tests
+F1_LIVE_BASE_URL = os.getenv("F1_LIVE_BASE_URL", "https://livetiming.formula1.com/signalr").strip().rstrip("/")
+
+
+def websocket_base_url(http_url: str) -> str:
+    if http_url.startswith("https://"):
+        return "wss://" + http_url[len("https://"):]
+    if http_url.startswith("http://"):
+        return "ws://" + http_url[len("http://"):]
+    return http_url
+
+
+F1_NEGOTIATE_URL = f"{F1_LIVE_BASE_URL}/negotiate"
+F1_CONNECT_URL = f"{websocket_base_url(F1_LIVE_BASE_URL)}/connect"
+F1_RECONNECT_URL = f"{websocket_base_url(F1_LIVE_BASE_URL)}/reconnect"
+SIGNALR_CONNECTION_DATA = '[{"name":"streaming"}]'
+
+# Reconnect backoff (seconds). Each retry sleeps a random amount up to
+# min(MAX, BASE * 2 ** attempt) ("full jitter").
+RECONNECT_BASE_DELAY = 1.0
+RECONNECT_MAX_DELAY = 60.0
+# SignalR sends keepalives every ~10 s, so a silent socket is a dead one
+F1_READ_TIMEOUT = 30.0
+
+_live_task: Optional["asyncio.Task"] = None
+_ingest_task: Optional["asyncio.Task"] = None
+
+
+class FeedHealth:
+    """
+    Connection bookkeeping for the live timing supervisor.
+    A disconnect lasts from losing the socket until the next Subscribe
+    snapshot is applied, i.e. the window where /positions serves stale data.
+    Reconnect latency is one successful attempt: negotiate -> snapshot.
+    """
+
+    def __init__(self, history: int = 50):
+        self.connected = False
+        self.connects = 0
+        self.disconnects = 0
+        self.failed_attempts = 0
+        self.resumes = 0
+        self.resume_failures = 0
+        self.live_since: Optional[float] = None
+        self.disconnected_at: Optional[float] = None
+        self.total_disconnected_s = 0.0
+        self.last_error: Optional[str] = None
+        self.disconnect_durations: deque = deque(maxlen=history)
+        self.reconnect_latencies: deque = deque(maxlen=history)
+
+    def on_live(self, attempt_started: float) -> None:
+        now = time.monotonic()
+        self.connects += 1
+        self.live_since = now
+        self.reconnect_latencies.append(now - attempt_started)
+        if self.disconnected_at is not None:
+            gap = now - self.disconnected_at
+            self.disconnect_durations.append(gap)
+            self.total_disconnected_s += gap
+            self.disconnected_at = None
+
+    def on_lost(self, error: Optional[str] = None) -> None:
+        if error:
+            self.last_error = error
+        if self.live_since is not None:
+            self.disconnects += 1
+            self.live_since = None
+            self.disconnected_at = time.monotonic()
+        else:
+            self.failed_attempts += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        durations = list(self.disconnect_durations)
+        latencies = list(self.reconnect_latencies)
+        return {
+            "connects": self.connects,
+            "disconnects": self.disconnects,
+            "failed_attempts": self.failed_attempts,
+            "resumes": self.resumes,
+            "resume_failures": self.resume_failures,
+            "live_for_s": round(now - self.live_since, 3) if self.live_since is not None else None,
+            "stale_for_s": round(now - self.disconnected_at, 3) if self.disconnected_at is not None else None,
+            "total_disconnected_s": round(self.total_disconnected_s, 3),
+            "last_disconnect_s": round(durations[-1], 3) if durations else None,
+            "max_disconnect_s": round(max(durations), 3) if durations else None,
+            "last_reconnect_latency_s": round(latencies[-1], 3) if latencies else None,
+            "max_reconnect_latency_s": round(max(latencies), 3) if latencies else None,
+            "last_error": self.last_error,
+        }
+
+
+_feed_health = FeedHealth()
+
+
+class DecodedFrame(NamedTuple):
+    is_subscribe: bool
+    cursor: Optional[str]
+    groups_token: Optional[str]
+    updates: List[TopicUpdate]
+    # Newest feed timestamp (A[2]) in the frame, unix seconds
+    upstream_ts: Optional[float] = None
+
+
+_EMPTY_FRAME = DecodedFrame(False, None, None, [])
+
+
+def decode_live_message(message: str) -> DecodedFrame:
+    """
+    Decode one SignalR frame into (topic, data, is_snapshot) updates for
+    subscribed topics, plus the message cursor (C) and groups token (G)
+    when the frame carries them.
+    """
+    try:
+        frame = _frame_decoder.decode(message)
+    except msgspec.DecodeError:
+        return _EMPTY_FRAME
+
+    if frame.R and str(frame.I) == "1":
+        try:
+            snapshot = _snapshot_decoder.decode(frame.R)
+        except msgspec.DecodeError:
+            return DecodedFrame(True, frame.C, frame.G, [])
+        return DecodedFrame(True, frame.C, frame.G, snapshot_updates(snapshot))
+
+    updates = []
+    upstream_ts = None
+    for msg in frame.M:
+        if msg.M != "feed" or len(msg.A) < 2:
+            continue
+
+        try:
+            topic = _str_decoder.decode(msg.A[0])
+        except msgspec.DecodeError:
+            continue
+        if topic not in SUBSCRIBED_TOPICS:
+            continue
+
+        try:
+            data = decode_topic_data(topic, msg.A[1])
+        except msgspec.DecodeError:
+            continue
+
+        updates.append((topic, data, False))
 
+        if len(msg.A) > 2:
+            try:
+                ts = parse_feed_utc(_str_decoder.decode(msg.A[2]))
+            except msgspec.DecodeError:
+                ts = None
+            if ts is not None and (upstream_ts is None or ts > upstream_ts):
+                upstream_ts = ts
 
-def _require_admin_token(x_admin_token: Optional[str]) -> None:
-    if not ADMIN_TOKEN:
-        raise HTTPException(status_code=500, detail="ADMIN_TOKEN not configured on server")
+    return DecodedFrame(False, frame.C, frame.G, updates, upstream_ts)
 
-    if not x_admin_token:
-        raise HTTPException(status_code=401, detail="Missing X-Admin-Token")
 
-    if not hmac.compare_digest(x_admin_token, ADMIN_TOKEN):
-        raise HTTPException(status_code=403, detail="Invalid admin token")
+def handle_live_message(message: str, session: Optional[LiveSession] = None) -> bool:
+    """
+    Decode and apply one SignalR frame inline (replay, benchmarks) to
+    session, by default the live one. Returns True if it was the Subscribe
+    response.
+    """
+    session = session or _live_session
+    received_ns = time.perf_counter_ns()
+    decoded = decode_live_message(message)
+    session.set_ingest_context(received_ns, decoded.upstream_ts)
+    for topic, data, is_snapshot in decoded.updates:
+        dispatch_topic(session, topic, data, is_snapshot)
+    return decoded.is_subscribe
 
 
-def normalize_driver_code(code: Optional[str]) -> Optional[str]:
-    if not code:
-        return None
-    code = str(code).strip().upper()
-    return FASTF1_TO_APP_CODE.get(code, code)
+# --------------------------------------------------
+# Ingest queue
+# The live socket loop only decodes frames and enqueues topic updates; a
+# worker task applies them. The queue is bounded. When it is full:
+#   coalesce    - telemetry (.z topics) is dropped on arrival; any other
+#                 update is merged into the newest queued delta of its topic,
+#                 otherwise the oldest queued telemetry is evicted. If that
+#                 fails too, a low-value state topic update is dropped, while
+#                 a KEEP_TOPICS update evicts a queued low-value one, or else
+#                 goes over the bound. Positions, the session and the driver
+#                 list are applied incrementally and their deltas are never
+#                 re-sent, so those are never lost.
+#   drop_oldest - the oldest non-snapshot update is evicted
+#   drop_newest - the incoming update is dropped
+# Subscribe snapshots are never dropped by the overflow policy; only a newer
+# snapshot replaces them.
+# --------------------------------------------------
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "2000"))
+INGEST_OVERFLOW_POLICY = os.getenv("INGEST_OVERFLOW_POLICY", "coalesce").strip().lower()
+TELEMETRY_TOPICS = frozenset({"CarData.z", "Position.z"})
+KEEP_TOPICS = frozenset({"TimingData", "SessionInfo", "DriverList"})
 
 
-def parse_driver_codes_from_env() -> List[str]:
-    if DRIVER_CODES_ENV:
-        parts = [p.strip().upper() for p in DRIVER_CODES_ENV.split(",")]
-        codes: List[str] = []
-        seen = set()
-        for c in parts:
-            if c and c not in seen:
-                seen.add(c)
-                codes.append(c)
-        return codes
+def coalesce_topic_delta(older: Any, newer: Any) -> Any:
+    """
+    Fold a newer delta into an older one of the same topic (last value
+    wins); None when the two can't be merged.
+    """
+    if isinstance(older, TimingDataDelta) and isinstance(newer, TimingDataDelta):
+        for drv, line in newer.Lines.items():
+            if line.Position is not None or drv not in older.Lines:
+                older.Lines[drv] = line
+        return older
+    if isinstance(older, dict) and isinstance(newer, dict):
+        return merge_topic_delta(older, newer)
+    return None
+
+
+class IngestQueue:
+    def __init__(self, maxsize: int = INGEST_QUEUE_SIZE, policy: str = INGEST_OVERFLOW_POLICY):
+        self.maxsize = maxsize
+        self.policy = policy
+        # [topic, data, is_snapshot, received perf_counter_ns, upstream unix ts]
+        self._items: deque = deque()
+        self._ready = asyncio.Event()
+
+        self.enqueued = 0
+        self.processed = 0
+        self.coalesced = 0
+        self.superseded = 0
+        self.failed = 0
+        self.worker_restarts = 0
+        self.max_depth = 0
+        self.dropped: Dict[str, int] = {}
+        self._latencies: deque = deque(maxlen=2048)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def _drop(self, topic: str) -> None:
+        self.dropped[topic] = self.dropped.get(topic, 0) + 1
+
+    def _evict_oldest(self, topics=None, spare=frozenset()) -> bool:
+        for i, item in enumerate(self._items):
+            if item[2] or item[0] in spare or (topics is not None and item[0] not in topics):
+                continue
+            del self._items[i]
+            self._drop(item[0])
+            return True
+        return False
+
+    def put(self, topic: str, data: Any, is_snapshot: bool = False,
+            upstream_ts: Optional[float] = None, received_ns: Optional[int] = None) -> None:
+        self.enqueued += 1
+
+        if len(self._items) >= self.maxsize and not is_snapshot:
+            if self.policy == "drop_newest":
+                self._drop(topic)
+                return
+
+            if self.policy == "coalesce":
+                if topic in TELEMETRY_TOPICS:
+                    self._drop(topic)
+                    return
+                for item in reversed(self._items):
+                    if item[0] == topic and not item[2]:
+                        merged = coalesce_topic_delta(item[1], data)
+                        if merged is not None:
+                            # Keeps the older receive time: lag is measured
+                            # from the first delta that was held back
+                            item[1] = merged
+                            item[4] = upstream_ts or item[4]
+                            self.coalesced += 1
+                            return
+                        break
+                if not self._evict_oldest(TELEMETRY_TOPICS):
+                    if topic not in KEEP_TOPICS:
+                        self._drop(topic)
+                        return
+                    self._evict_oldest(spare=KEEP_TOPICS)
+            else:
+                self._evict_oldest()
+
+        self._items.append([topic, data, is_snapshot, received_ns or time.perf_counter_ns(), upstream_ts])
+        if len(self._items) > self.max_depth:
+            self.max_depth = len(self._items)
+        self._ready.set()
+
+    def put_snapshot(self, updates: List[TopicUpdate], received_ns: Optional[int] = None) -> None:
+        """
+        A Subscribe snapshot supersedes everything still waiting, deltas and
+        older snapshots alike, so the queue is replaced by it.
+        """
+        self.superseded += len(self._items)
+        self._items.clear()
+
+        received_ns = received_ns or time.perf_counter_ns()
+        self._items.extend([topic, data, True, received_ns, None] for topic, data, _ in updates)
+        self.enqueued += len(updates)
+        if len(self._items) > self.max_depth:
+            self.max_depth = len(self._items)
+        if self._items:
+            self._ready.set()
+
+    async def get(self):
+        while not self._items:
+            self._ready.clear()
+            await self._ready.wait()
+        return self._items.popleft()
+
+    def task_done(self, enqueued_ns: int) -> None:
+        self.processed += 1
+        self._latencies.append(time.perf_counter_ns() - enqueued_ns)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "depth": len(self._items),
+            "max_depth": self.max_depth,
+            "capacity": self.maxsize,
+            "policy": self.policy,
+            "enqueued": self.enqueued,
+            "processed": self.processed,
+            "coalesced": self.coalesced,
+            "superseded": self.superseded,
+            "failed": self.failed,
+            "worker_restarts": self.worker_restarts,
+            "dropped": dict(self.dropped),
+            "enqueue_to_processed": latency_summary(list(self._latencies)),
+        }
 
-    # Fallback: your actual 22-driver list
-    return [
-        "PER", "GAS", "COL", "ALO", "STR", "BOT",
-        "LEC", "HAM", "BEA", "OCO", "PIA", "NOR",
-        "RUS", "LAW", "LIN", "VER", "HAD", "HUL",
-        "BOR", "SAI", "ALB", "ANT",
-    ]
+
+_ingest_queue = IngestQueue()
 
 
+async def run_ingest_worker(q: IngestQueue) -> None:
+    while True:
+        topic, data, is_snapshot, received_ns, upstream_ts = await q.get()
+        try:
+            session = route_live_session(data) if topic == "SessionInfo" else _live_session
+            session.set_ingest_context(received_ns, upstream_ts)
+            dispatch_topic(session, topic, data, is_snapshot)
+        except Exception as e:
+            # Skip the update, keep the worker: a dead worker freezes positions
+            q.failed += 1
+            print(f"Ingest of {topic} failed:", repr(e))
+        q.task_done(received_ns)
+        # Let the socket reader run between updates when there is a backlog
+        if q:
+            await asyncio.sleep(0)
 
 
-def process_timing_data(data):
-    global latest_positions, latest_updated_at
+def ensure_ingest_worker() -> None:
+    """
+    Restart the ingest worker if it has died, so the socket never keeps
+    filling a queue nobody drains.
+    """
+    global _ingest_task
 
-    lines = data.get("Lines")
-    if not lines:
+    if _ingest_task is None or not _ingest_task.done():
         return
+    if not _ingest_task.cancelled():
+        print("Ingest worker stopped, restarting:", repr(_ingest_task.exception()))
+    _ingest_queue.worker_restarts += 1
+    _ingest_task = asyncio.get_running_loop().create_task(run_ingest_worker(_ingest_queue))
 
-    rows = []
 
-    for drv, info in lines.items():
-        pos = info.get("Position")
-        if not pos:
-            continue
+class SignalRConnection:
+    """
+    Resume state of one negotiated connection: its token plus the last
+    message cursor (C) and groups token (G) received on it. The server
+    keeps the connection (and our subscription) for DisconnectTimeout
+    seconds after the socket drops; within that window /reconnect with
+    messageId=<cursor> replays what we missed instead of a full snapshot.
+    """
 
-        code = driver_number_to_code(drv)
-        if not code:
-            continue
+    def __init__(self, token: str, disconnect_timeout: float = 30.0):
+        self.token = token
+        self.disconnect_timeout = disconnect_timeout
+        self.cursor: Optional[str] = None
+        self.groups_token: Optional[str] = None
+        self.lost_at: Optional[float] = None
+        self.frames = 0  # frames received on the current socket
+
+    def can_resume(self) -> bool:
+        return (
+            self.cursor is not None
+            and self.lost_at is not None
+            and time.monotonic() - self.lost_at < self.disconnect_timeout
+        )
 
-        try:
-            pos = int(pos)
-        except:
-            continue
 
-        rows.append({
-            "position": pos,
-            "driver": code
-        })
+async def negotiate_f1_live_timing(http: aiohttp.ClientSession) -> SignalRConnection:
+    params = {
+        "clientProtocol": "1.5",
+        "connectionData": SIGNALR_CONNECTION_DATA,
+    }
+    async with http.get(F1_NEGOTIATE_URL, params=params) as r:
+        r.raise_for_status()
+        data = await r.json(content_type=None)
+    return SignalRConnection(data["ConnectionToken"], float(data.get("DisconnectTimeout") or 30.0))
 
-    rows.sort(key=lambda x: x["position"])
 
-    if rows:
-        latest_positions = rows
-        latest_updated_at = utc_iso_now()
+def build_connect_url(token: str) -> str:
+    return (
+        f"{F1_CONNECT_URL}?"
+        "transport=webSockets&clientProtocol=1.5"
+        f"&connectionToken={urllib.parse.quote(token, safe='')}"
+        f"&connectionData={urllib.parse.quote(SIGNALR_CONNECTION_DATA, safe='')}"
+    )
 
-def start_f1_live_timing():
-    global ws_connected
 
-    try:
-        # Step 1: negotiate connection token
-        negotiate_url = "https://livetiming.formula1.com/signalr/negotiate"
-        params = {
-            "clientProtocol": "1.5",
-            "connectionData": '[{"name":"streaming"}]'
-        }
+def build_reconnect_url(conn: SignalRConnection) -> str:
+    url = (
+        f"{F1_RECONNECT_URL}?"
+        "transport=webSockets&clientProtocol=1.5"
+        f"&connectionToken={urllib.parse.quote(conn.token, safe='')}"
+        f"&connectionData={urllib.parse.quote(SIGNALR_CONNECTION_DATA, safe='')}"
+        f"&messageId={urllib.parse.quote(conn.cursor or '', safe='')}"
+    )
+    if conn.groups_token:
+        url += f"&groupsToken={urllib.parse.quote(conn.groups_token, safe='')}"
+    return url
 
-        r = requests.get(negotiate_url, params=params, timeout=10)
-        r.raise_for_status()
 
-        data = r.json()
-        token = data["ConnectionToken"]
+async def stream_f1_live_timing(http: aiohttp.ClientSession, conn: SignalRConnection,
+                                resume: bool, attempt_started: float) -> None:
+    """
+    One socket lifetime on `conn`. A fresh connection subscribes and goes
+    live on the snapshot; a resumed one goes live on its first frame.
+    Raises on failure; returns on a clean close.
+    """
+    url = build_reconnect_url(conn) if resume else build_connect_url(conn.token)
+    conn.frames = 0
 
-        token = urllib.parse.quote(token)
+    async with http.ws_connect(url, heartbeat=30) as ws:
+        _feed_health.connected = True
+        try:
+            if not resume:
+                subscribe = {
+                    "H": "streaming",
+                    "M": "Subscribe",
+                    "A": [LIVE_TOPICS],
+                    "I": 1
+                }
+                await ws.send_str(json.dumps(subscribe))
+
+            while True:
+                msg = await ws.receive(timeout=F1_READ_TIMEOUT)
+                if msg.type == aiohttp.WSMsgType.TEXT:
+                    received_ns = time.perf_counter_ns()
+                    if _frame_recorder is not None:
+                        _frame_recorder.record(msg.data)
+                    decoded = decode_live_message(msg.data)
+                    ensure_ingest_worker()
+                    if decoded.upstream_ts is not None:
+                        _live_session.network_lag.add((time.time() - decoded.upstream_ts) * 1e3)
+
+                    if decoded.is_subscribe:
+                        _ingest_queue.put_snapshot(decoded.updates, received_ns)
+                    else:
+                        for topic, data, is_snapshot in decoded.updates:
+                            _ingest_queue.put(topic, data, is_snapshot, decoded.upstream_ts, received_ns)
+
+                    if decoded.cursor is not None:
+                        conn.cursor = decoded.cursor
+                    if decoded.groups_token is not None:
+                        conn.groups_token = decoded.groups_token
+
+                    conn.frames += 1
+                    if resume and conn.frames == 1:
+                        _feed_health.resumes += 1
+                        _feed_health.on_live(attempt_started)
+                    elif decoded.is_subscribe:
+                        _feed_health.on_live(attempt_started)
+                elif msg.type in (aiohttp.WSMsgType.CLOSE, aiohttp.WSMsgType.CLOSING,
+                                  aiohttp.WSMsgType.CLOSED):
+                    return
+                elif msg.type == aiohttp.WSMsgType.ERROR:
+                    raise ws.exception() or ConnectionError("websocket error")
+        finally:
+            _feed_health.connected = False
+
+
+def reconnect_delay(attempt: int) -> float:
+    cap = min(RECONNECT_MAX_DELAY, RECONNECT_BASE_DELAY * (2 ** attempt))
+    return random.uniform(0, cap)
+
+
+async def run_f1_live_timing() -> None:
+    """
+    Supervisor: keeps the feed connected for the life of the app. After a
+    drop it first tries to resume the old connection from its last cursor;
+    if that is not possible or is refused, it re-negotiates and
+    re-subscribes (full snapshot). Retries use jittered exponential backoff.
+    """
+    attempt = 0
+    conn: Optional[SignalRConnection] = None
+    timeout = aiohttp.ClientTimeout(total=None, sock_connect=10, sock_read=None)
+    async with aiohttp.ClientSession(timeout=timeout) as http:
+        while True:
+            ensure_ingest_worker()
+            connects_before = _feed_health.connects
+            attempt_started = time.monotonic()
+            try:
+                resumed = False
+                if conn is not None and conn.can_resume():
+                    try:
+                        await stream_f1_live_timing(http, conn, True, attempt_started)
+                    except asyncio.CancelledError:
+                        raise
+                    except Exception as e:
+                        if conn.frames:
+                            raise
+                        # Refused or dead on arrival: fall back to a full snapshot
+                        print("F1 live timing resume failed, resubscribing:", e)
+                    resumed = conn.frames > 0
+                    if not resumed:
+                        _feed_health.resume_failures += 1
+                        conn = None
+
+                if not resumed:
+                    async with asyncio.timeout(10):
+                        conn = await negotiate_f1_live_timing(http)
+                    await stream_f1_live_timing(http, conn, False, attempt_started)
+
+                _feed_health.on_lost("closed by server")
+                print("F1 live timing connection closed")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                _feed_health.on_lost(f"{type(e).__name__}: {e}")
+                print("F1 live timing connection failed:", repr(e))
+
+            if conn is not None:
+                conn.lost_at = time.monotonic()
+
+            # A connection that got as far as going live resets the backoff
+            attempt = 0 if _feed_health.connects > connects_before else attempt + 1
+            await asyncio.sleep(reconnect_delay(attempt))
+
+
+def start_live_timing_task() -> None:
+    global _live_task, _ingest_task
+
+    if not LIVE_TIMING_ENABLED:
+        return
+    if _live_task is not None and not _live_task.done():
+        return
 
-        ws_url = (
-            "wss://livetiming.formula1.com/signalr/connect?"
-            f"transport=webSockets&clientProtocol=1.5"
-            f"&connectionToken={token}"
-            "&connectionData=%5B%7B%22name%22%3A%22streaming%22%7D%5D"
-        )
+    loop = asyncio.get_running_loop()
+    _ingest_task = loop.create_task(run_ingest_worker(_ingest_queue))
+    _live_task = loop.create_task(run_f1_live_timing())
 
-    except Exception as e:
-        print("F1 negotiate failed:", e)
-        return
 
-    def on_message(ws, message):
-        try:
-            payload = json.loads(message)
-        except:
-            return
+async def stop_live_timing_task() -> None:
+    global _live_task, _ingest_task
 
-        if "M" not in payload:
-            return
+    tasks = [t for t in (_live_task, _ingest_task) if t is not None]
+    _live_task = _ingest_task = None
 
-        for msg in payload["M"]:
-            if msg.get("M") != "feed":
-                continue
+    for task in tasks:
+        task.cancel()
+    for task in tasks:
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
 
-            args = msg.get("A")
-            if not args or len(args) < 2:
-                continue
 
-            topic = args[0]
-            data = args[1]
+# --------------------------------------------------
+# Replay
+# Feeds recorded frames through handle_live_message on a virtual clock:
+# speed=1 is real time, N is N x faster, 0 runs as fast as possible.
+# Used to benchmark ingest + publish offline against real race traffic,
+# or (POST /live/replay) to replay into its own session next to the
+# live one.
+# --------------------------------------------------
+def latency_summary(values_ns: List[int]) -> Dict[str, Any]:
+    if not values_ns:
+        return {"p50_us": None, "p99_us": None, "max_us": None, "mean_us": None}
+    arr = np.asarray(values_ns, dtype=np.float64) / 1e3
+    p50, p99 = np.percentile(arr, [50, 99])
+    return {
+        "p50_us": round(float(p50), 2),
+        "p99_us": round(float(p99), 2),
+        "max_us": round(float(arr.max()), 2),
+        "mean_us": round(float(arr.mean()), 2),
+    }
 
-            if topic == "TimingData":
-                process_timing_data(data)
 
-    def on_open(ws):
-        global ws_connected
-        ws_connected = True
+async def replay_frames(frames, speed: float = 1.0, handler: Callable[[str], Any] = None,
+                        yield_every: int = 256, session: Optional[LiveSession] = None) -> Dict[str, Any]:
+    """
+    frames: iterable of (recorded unix time, raw message), e.g. iter_frame_log().
+    Frames are applied to session (default: the live one) unless a handler
+    is given.
+    """
+    if handler is None:
+        session = session or _live_session
+        handler = lambda message: handle_live_message(message, session)
+    latencies: List[int] = []
+    first_ts: Optional[float] = None
+    max_behind = 0.0
+
+    started = time.monotonic()
+    for n, (ts, message) in enumerate(frames):
+        if first_ts is None:
+            first_ts = ts
+
+        if speed > 0:
+            due = (ts - first_ts) / speed
+            ahead = due - (time.monotonic() - started)
+            if ahead > 0:
+                await asyncio.sleep(ahead)
+            elif -ahead > max_behind:
+                max_behind = -ahead
+        elif n % yield_every == 0:
+            # Flat out, but let the event loop serve requests now and then
+            await asyncio.sleep(0)
+
+        t0 = time.perf_counter_ns()
+        handler(message)
+        latencies.append(time.perf_counter_ns() - t0)
+
+    elapsed = time.monotonic() - started
+    frames_done = len(latencies)
+    return {
+        "frames": frames_done,
+        "speed": speed,
+        "wall_s": round(elapsed, 3),
+        "recorded_span_s": round(ts - first_ts, 3) if frames_done else 0.0,
+        "frames_per_s": round(frames_done / elapsed, 1) if elapsed > 0 else None,
+        "max_behind_schedule_s": round(max_behind, 4),
+        "latency": latency_summary(latencies),
+    }
 
-        subscribe = {
-            "H": "streaming",
-            "M": "Subscribe",
-            "A": [["TimingData"]],
-            "I": 1
-        }
 
-        ws.send(json.dumps(subscribe))
+_replay_tasks: Dict[str, "asyncio.Task"] = {}
 
-    def on_close(ws, *_):
-        global ws_connected
-        ws_connected = False
 
-    ws = websocket.WebSocketApp(
-        ws_url,
-        on_message=on_message,
-        on_open=on_open,
-        on_close=on_close
-    )
+def start_replay(race_id: str, path: str, speed: float) -> LiveSession:
+    """
+    Replay a frame log into a new session registered as race_id.
+    """
+    race_id = canonical_race_id(race_id)
+    if race_id == _live_session.race_id:
+        raise ValueError("race_id is the live session")
 
-    ws.run_forever()
+    previous = _replay_tasks.pop(race_id, None)
+    if previous is not None:
+        previous.cancel()
 
-    def on_open(ws):
-        global ws_connected
-        ws_connected = True
+    session = open_session(race_id, source="replay")
 
-        subscribe = {
-            "H": "streaming",
-            "M": "Subscribe",
-            "A": [["TimingData"]],
-            "I": 1
-        }
+    async def run():
+        try:
+            report = await replay_frames(iter_frame_log(path), speed=speed, session=session)
+            print(f"Replay {race_id} finished:", report["frames"], "frames")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Replay {race_id} failed:", repr(e))
 
-        ws.send(json.dumps(subscribe))
+    _replay_tasks[race_id] = asyncio.get_running_loop().create_task(run())
+    return session
 
-    def on_close(ws, *_):
-        global ws_connected
-        ws_connected = False
 
-    ws = websocket.WebSocketApp(
-        "wss://livetiming.formula1.com/signalr/connect?transport=webSockets&clientProtocol=1.5&connectionData=%5B%7B%22name%22%3A%22streaming%22%7D%5D",
-        on_message=on_message,
-        on_open=on_open,
-        on_close=on_close,
-    )
+async def stop_replays() -> None:
+    tasks = list(_replay_tasks.values())
+    _replay_tasks.clear()
+    for task in tasks:
+        task.cancel()
+    for task in tasks:
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
 
-    ws.run_forever()
 
 def ensure_grid_loaded(force_reload: bool = False) -> None:
     global _grid, _last_grid_loaded_at_utc
@@ -457,6 +2269,17 @@ def extract_grid_from_race_results(results_df) -> List[Dict[str, Any]]:
     return rows
 
 
+def has_grid_positions(results_df) -> bool:
+    """
+    True if FastF1 gave at least one real GridPosition. Before the race the
+    column is all NaN and extract_grid_from_race_results returns only the
+    DRIVER_CODES padding.
+    """
+    if results_df is None or len(results_df) == 0 or "GridPosition" not in results_df:
+        return False
+    return any((safe_int(v) or 0) > 0 for v in results_df["GridPosition"])
+
+
 def extract_grid_from_quali_results(results_df) -> List[Dict[str, Any]]:
     rows = []
     if results_df is None or len(results_df) == 0:
@@ -620,30 +2443,395 @@ def infer_results_provisional(results_df, numeric_results: List[Dict[str, Any]])
     return True
 
 
-def driver_number_to_code(num: str) -> str:
-    mapping = {
-        "1": "VER",
-        "4": "NOR",
-        "5": "BOR",
-        "10": "GAS",
-        "11": "PER",
-        "12": "ANT",
-        "14": "ALO",
-        "16": "LEC",
-        "18": "STR",
-        "23": "ALB",
-        "27": "HUL",
-        "30": "LAW",
-        "31": "OCO",
-        "43": "COL",
-        "44": "HAM",
-        "55": "SAI",
-        "63": "RUS",
-        "77": "BOT",
-        "81": "PIA",
-        "87": "BEA",
-    }
-    return mapping.get(num)
+# --------------------------------------------------
+# Conditional responses
+# Every cacheable endpoint sends an ETag and answers If-None-Match with
+# 304 without a body. /positions derives it from the published version.
+# /grid and /results are FastF1 loads: their JSON is kept per race_id for
+# RESPONSE_CACHE_SECONDS, tagged with a hash of the payload minus
+# updated_at, so a poll inside that window neither reloads nor re-encodes.
+# --------------------------------------------------
+RESPONSE_CACHE_SECONDS = float(os.getenv("RESPONSE_CACHE_SECONDS", "60"))
+# Failed or empty loads are retried sooner
+RESPONSE_CACHE_RETRY_SECONDS = 10.0
+RESPONSE_CACHE_RETRY_STATUSES = frozenset({"error", "not_available", "not_finished"})
+
+
+class CachedBody(NamedTuple):
+    etag: str
+    body: bytes
+    expires: float
+    cache_control: str
+    # Content-Encoding -> compressed body; None = always sent as-is
+    variants: Optional[Dict[str, bytes]] = None
+
+
+_response_cache: Dict[Tuple[str, str], CachedBody] = {}
+_response_cache_locks: Dict[Tuple[str, str], threading.Lock] = {}
+_response_cache_lock = threading.Lock()
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    If-None-Match uses weak comparison: W/ prefixes are ignored.
+    """
+    if not if_none_match:
+        return False
+    tag = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == tag or candidate == "*":
+            return True
+    return False
+
+
+def encode_tagged(payload: Dict[str, Any]) -> Tuple[str, bytes]:
+    content = _json_encoder.encode({k: v for k, v in payload.items() if k != "updated_at"})
+    etag = '"' + hashlib.blake2b(content, digest_size=12).hexdigest() + '"'
+    return etag, _json_encoder.encode(payload)
+
+
+def cached_body(endpoint: str, race_id: str, build: Callable[[str], Dict[str, Any]]) -> CachedBody:
+    # Unknown ids fail fast and cheaply; the sim grid changes on admin
+    # calls. Neither is worth a cache entry.
+    if race_id not in RACE_ID_TO_ROUND or race_id == SIM_RACE_ID:
+        payload = build(race_id)
+        return CachedBody(*encode_tagged(payload), 0.0, payload_cache_control(race_id, payload))
+
+    key = (endpoint, race_id)
+    cached = _response_cache.get(key)
+    if cached is not None and cached.expires > time.monotonic():
+        return cached
+
+    with _response_cache_lock:
+        lock = _response_cache_locks.setdefault(key, threading.Lock())
+
+    # One load per key at a time; the others wait and take its result
+    with lock:
+        cached = _response_cache.get(key)
+        if cached is not None and cached.expires > time.monotonic():
+            return cached
+
+        payload = build(race_id)
+        etag, body = encode_tagged(payload)
+        ttl = RESPONSE_CACHE_RETRY_SECONDS if payload.get("status") in RESPONSE_CACHE_RETRY_STATUSES \
+            else RESPONSE_CACHE_SECONDS
+        cached = _response_cache[key] = CachedBody(
+            etag, body, time.monotonic() + ttl,
+            payload_cache_control(race_id, payload), compress_variants(body),
+        )
+        return cached
+
+
+def cached_json_response(endpoint: str, race_id: str, build: Callable[[str], Dict[str, Any]],
+                         if_none_match: Optional[str], accept_encoding: Optional[str]) -> Response:
+    cached = cached_body(endpoint, race_id, build)
+    return negotiated_response(cached.body, cached.etag, cached.variants, accept_encoding,
+                               if_none_match, cached.cache_control)
+
+
+# --------------------------------------------------
+# Cache-Control
+# Shared caches (the CDN) may keep a response as long as the data behind
+# it is expected to stay the same:
+#   live      - positions change any second; serve stale while refetching
+#   provisional - grid from qualifying, unconfirmed results
+#   final     - race grid (from real GridPosition values) and confirmed
+#               results do not change again
+#   unavailable - errors, not live / not available yet: retry soon
+# 304s carry the same header, so revalidations refresh the edge copy.
+# --------------------------------------------------
+CACHE_CONTROL_LIVE = "public, max-age=1, stale-while-revalidate=2"
+CACHE_CONTROL_PROVISIONAL = "public, max-age=30, stale-while-revalidate=120"
+CACHE_CONTROL_FINAL = "public, max-age=86400, immutable"
+CACHE_CONTROL_UNAVAILABLE = "public, max-age=2"
+
+
+def payload_cache_control(race_id: str, payload: Dict[str, Any]) -> str:
+    """
+    Policy for a /grid or /results payload, from its status fields.
+    """
+    status = payload.get("status")
+    if race_id == SIM_RACE_ID:
+        # Admin calls reshuffle the sim at any time
+        return CACHE_CONTROL_LIVE if status == "ok" else CACHE_CONTROL_UNAVAILABLE
+
+    if status == "ok":
+        return CACHE_CONTROL_FINAL if payload.get("grid_status") == "final" else CACHE_CONTROL_PROVISIONAL
+    if status == "finished":
+        return CACHE_CONTROL_PROVISIONAL if payload.get("is_provisional", True) else CACHE_CONTROL_FINAL
+    return CACHE_CONTROL_UNAVAILABLE
+
+
+# --------------------------------------------------
+# Compressed variants
+# Hot bodies are compressed once per content version, not per request:
+# /grid and /results when they are cached, a /positions version the first
+# time a client asks for it in that encoding. brotli is optional; without
+# it only gzip is offered. Each variant has its own ETag (suffix -gzip /
+# -br) since its bytes differ.
+# --------------------------------------------------
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Bodies smaller than this are not worth a Content-Encoding
+COMPRESS_MIN_BYTES = 256
+COMPRESS_GZIP_LEVEL = 6
+COMPRESS_BROTLI_QUALITY = 9
+
+# Best first
+CONTENT_ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+_accept_encoding_cache: Dict[str, Optional[str]] = {}
+
+
+def compress_body(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=COMPRESS_BROTLI_QUALITY)
+    # mtime=0: the same body always compresses to the same bytes
+    return gzip.compress(body, compresslevel=COMPRESS_GZIP_LEVEL, mtime=0)
+
+
+def compress_variants(body: bytes) -> Optional[Dict[str, bytes]]:
+    if len(body) < COMPRESS_MIN_BYTES:
+        return None
+    return {encoding: compress_body(body, encoding) for encoding in CONTENT_ENCODINGS}
+
+
+def choose_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    Best encoding we offer that the Accept-Encoding header allows (q > 0),
+    or None for identity. Clients send few distinct headers, so results
+    are memoised.
+    """
+    if not accept_encoding:
+        return None
+    try:
+        return _accept_encoding_cache[accept_encoding]
+    except KeyError:
+        pass
+
+    accepted: Dict[str, float] = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip()] = q
+
+    wildcard = accepted.get("*", 0.0)
+    chosen = next((e for e in CONTENT_ENCODINGS if accepted.get(e, wildcard) > 0), None)
+    if len(_accept_encoding_cache) < 256:
+        _accept_encoding_cache[accept_encoding] = chosen
+    return chosen
+
+
+def negotiated_response(body: bytes, etag: Optional[str], variants: Optional[Dict[str, bytes]],
+                        accept_encoding: Optional[str], if_none_match: Optional[str],
+                        cache_control: str) -> Response:
+    """
+    200 with body (or its compressed variant) and ETag, or 304 when
+    If-None-Match already has that representation. variants is filled on
+    demand; None means the body is never compressed.
+    """
+    encoding = choose_encoding(accept_encoding) if variants is not None else None
+    headers = {"Vary": "Accept-Encoding", "Cache-Control": cache_control}
+    if etag:
+        if encoding:
+            etag = f'{etag[:-1]}-{encoding}"'
+        headers["ETag"] = etag
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+
+    if encoding:
+        data = variants.get(encoding)
+        if data is None:
+            data = variants[encoding] = compress_body(body, encoding)
+        headers["Content-Encoding"] = encoding
+        return Response(data, media_type="application/json", headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
+
+
+# --------------------------------------------------
+# /ws/positions fan-out
+# One channel per followed race_id (None = whatever is live) with a
+# broadcaster task that wakes on the session's change notifier and
+# encodes each new version once per distinct driver filter. Subscribers
+# only get frames appended to their own small queue; sending happens in
+# each client's own task, so a slow socket never holds up the broadcaster
+# or other clients. A queue that fills up is collapsed to the newest frame
+# (every frame is a full snapshot) or, with WS_SLOW_CLIENT_POLICY=
+# disconnect, the client is dropped.
+# --------------------------------------------------
+WS_CLIENT_QUEUE_SIZE = int(os.getenv("WS_CLIENT_QUEUE_SIZE", "8"))
+WS_SLOW_CLIENT_POLICY = os.getenv("WS_SLOW_CLIENT_POLICY", "collapse").strip().lower()
+
+
+class PositionSubscriber:
+    __slots__ = ("drivers", "pending", "wake", "dropped")
+
+    def __init__(self, drivers: Optional[frozenset]):
+        self.drivers = drivers
+        self.pending: deque = deque()
+        self.wake = asyncio.Event()
+        self.dropped = False
+
+
+class PositionChannel:
+    def __init__(self, race_id: Optional[str]):
+        self.race_id = race_id
+        self.subscribers: set = set()
+        self.task: Optional["asyncio.Task"] = None
+        # driver filter -> encoded frame, for self.version only
+        self.frames: Dict[Optional[frozenset], str] = {}
+        self.version = -1
+        self.session: Optional[LiveSession] = None
+
+
+class PositionHub:
+    def __init__(self, queue_size: int = WS_CLIENT_QUEUE_SIZE, policy: str = WS_SLOW_CLIENT_POLICY):
+        self.queue_size = queue_size
+        self.policy = policy
+        self._channels: Dict[Optional[str], PositionChannel] = {}
+
+        self.broadcasts = 0
+        self.frames_queued = 0
+        self.collapsed = 0
+        self.disconnected_slow = 0
+
+    def _frame(self, channel: PositionChannel, drivers: Optional[frozenset]) -> str:
+        frame = channel.frames.get(drivers)
+        if frame is not None:
+            return frame
+
+        session = channel.session
+        published = session.published
+        if drivers is None:
+            body = published.body if published.order else not_live_positions_body(session, channel.race_id)
+        else:
+            order = [row for row in published.order if row["driver"] in drivers]
+            body = _json_encoder.encode({
+                "status": "live" if published.order else "not_live",
+                "race_id": session.race_id,
+                "session_type": session.session_type,
+                "version": published.version,
+                "cursor": session.cursor(published.version),
+                "updated_at": published.updated_at or utc_iso_now(),
+                "upstream_at": published.upstream_at,
+                "order": order,
+            })
+        frame = channel.frames[drivers] = body.decode("utf-8")
+        return frame
+
+    def _push(self, channel: PositionChannel, sub: PositionSubscriber) -> None:
+        if sub.dropped:
+            return
+        if len(sub.pending) >= self.queue_size:
+            if self.policy == "disconnect":
+                sub.dropped = True
+                sub.wake.set()
+                self.disconnected_slow += 1
+                return
+            # Only the newest snapshot matters to a client that fell behind
+            sub.pending.clear()
+            self.collapsed += 1
+        sub.pending.append(self._frame(channel, sub.drivers))
+        sub.wake.set()
+        self.frames_queued += 1
+
+    def _refresh(self, channel: PositionChannel) -> bool:
+        """
+        Point the channel at its current session and version; True if the
+        cached frames were stale.
+        """
+        session = get_session(channel.race_id)
+        if session is None:
+            return False
+        version = session.published.version
+        if session is channel.session and version == channel.version:
+            return False
+        channel.session = session
+        channel.version = version
+        channel.frames.clear()
+        return True
+
+    def _deliver(self, channel: PositionChannel) -> None:
+        if self._refresh(channel):
+            self.broadcasts += 1
+            for sub in list(channel.subscribers):
+                self._push(channel, sub)
+
+    async def _broadcast(self, channel: PositionChannel) -> None:
+        while channel.subscribers:
+            changed = channel.session.changed()
+            self._deliver(channel)
+            try:
+                # Timeout: notice a re-opened race_id that never notified us
+                async with asyncio.timeout(POSITIONS_STREAM_KEEPALIVE_SECONDS):
+                    await changed.wait()
+            except TimeoutError:
+                pass
+
+    def subscribe(self, race_id: Optional[str], drivers: Optional[frozenset]) -> PositionSubscriber:
+        channel = self._channels.get(race_id)
+        if channel is None:
+            channel = self._channels[race_id] = PositionChannel(race_id)
+        # Catch existing subscribers up first, so the channel's version is
+        # never ahead of what they were sent
+        self._deliver(channel)
+
+        sub = PositionSubscriber(drivers)
+        channel.subscribers.add(sub)
+        # Current order first, then every new version
+        self._push(channel, sub)
+
+        if channel.task is None or channel.task.done():
+            channel.task = asyncio.get_running_loop().create_task(self._broadcast(channel))
+        return sub
+
+    def unsubscribe(self, race_id: Optional[str], sub: PositionSubscriber) -> None:
+        channel = self._channels.get(race_id)
+        if channel is None:
+            return
+        channel.subscribers.discard(sub)
+        if not channel.subscribers:
+            if channel.task is not None:
+                channel.task.cancel()
+            del self._channels[race_id]
+
+    async def stop(self) -> None:
+        tasks = [c.task for c in self._channels.values() if c.task is not None]
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "channels": {str(key): len(c.subscribers) for key, c in self._channels.items()},
+            "subscribers": sum(len(c.subscribers) for c in self._channels.values()),
+            "queue_size": self.queue_size,
+            "policy": self.policy,
+            "broadcasts": self.broadcasts,
+            "frames_queued": self.frames_queued,
+            "collapsed": self.collapsed,
+            "disconnected_slow": self.disconnected_slow,
+        }
+
+
+_position_hub = PositionHub()
+
 
 # --------------------------------------------------
 # Public endpoints
@@ -653,60 +2841,352 @@ def health():
     return {"status": "ok"}
 
 
-@app.get("/positions")
-def positions():
+@app.get("/live/metrics")
+async def live_metrics():
+    # async def: reads session stats on the loop that writes them
+    return {
+        "ws_connected": _feed_health.connected,
+        "live_race_id": _live_session.race_id,
+        "connection": _feed_health.snapshot(),
+        "ingest_queue": _ingest_queue.snapshot(),
+        "ws_positions": _position_hub.snapshot(),
+        "sessions": {race_id: session.snapshot() for race_id, session in _sessions.items()},
+        "recorder": _frame_recorder.snapshot() if _frame_recorder is not None else None,
+        "updated_at": utc_iso_now(),
+    }
 
-    if latest_positions:
-        return {
-            "status": "live",
-            "race_id": "2026-australia",
-            "updated_at": latest_updated_at,
-            "order": latest_positions[:8],
-        }
 
-    return {
+def not_live_positions_body(session: Optional[LiveSession], race_id: Optional[str]) -> bytes:
+    """
+    /positions body while a session has no order. It only changes with the
+    clock (updated_at has one second resolution), so a known session keeps
+    the one it built this second.
+    """
+    now = int(time.time())
+    if session is not None and session.not_live_body[0] == now:
+        return session.not_live_body[1]
+
+    body = _json_encoder.encode({
         "status": "not_live",
-        "race_id": "2026-australia",
-        "updated_at": utc_iso_now(),
+        "race_id": session.race_id if session is not None else canonical_race_id(race_id),
+        "session_type": session.session_type if session is not None else None,
+        "version": session.published.version if session is not None else 0,
+        "cursor": session.cursor(session.published.version) if session is not None else None,
+        "updated_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(now)),
+        "upstream_at": None,
         "order": [],
-    }
+    })
+    if session is not None:
+        session.not_live_body = (now, body)
+    return body
+
+
+# Longest a since_version request is parked before answering unchanged
+POSITIONS_LONG_POLL_MAX_SECONDS = 30.0
 
-    # 2) Oikea live-race FastF1:stä
-    # Tässä oletetaan että nyt käynnissä oleva kisa on Australian GP
-    # Voit vaihtaa tämän myöhemmin dynaamiseksi.
-    live_race_id = "2026-australia"
 
+async def wait_for_new_version(race_id: Optional[str], cursor: str, timeout: float) -> None:
+    """
+    Park until the session publishes a version other than the one cursor
+    names, is replaced (new live session, re-opened race_id), or timeout
+    passes. A cursor from another session returns at once: the client's
+    order is from a session that is gone. Waiting is on the session's
+    change notifier: no thread, no polling.
+    """
+    session = get_session(race_id)
+    since_version = session.version_of(cursor) if session is not None else None
+    if since_version is None:
+        return
     try:
-        live_rows = get_live_stream_order_for_race_id(live_race_id)
+        async with asyncio.timeout(timeout):
+            while session is not None and session.published.version == since_version:
+                await session.changed().wait()
+                current = get_session(race_id)
+                if current is not session:
+                    return
+    except TimeoutError:
+        pass
 
-        if len(live_rows) == 0:
-            return {
-                "status": "not_live",
-                "race_id": live_race_id,
-                "updated_at": utc_iso_now(),
-                "order": [],
-            }
 
-        # palauta top 8
+def positions_delta_body(session: LiveSession, cursor: str) -> Optional[bytes]:
+    """
+    Net moves between the version the cursor names and the current one, or
+    None when the cursor is from another session (versions restart with
+    every session) or no longer in the moves log, and the caller must send
+    the full order.
+    """
+    delta_from = session.version_of(cursor)
+    published = session.published
+    log = session.moves_log
+    if delta_from is None or not log or not log[0][0] - 1 <= delta_from <= published.version:
+        return None
+
+    if session.delta_bodies_version != published.version:
+        session.delta_bodies = {}
+        session.delta_bodies_version = published.version
+    body = session.delta_bodies.get(delta_from)
+    if body is not None:
+        return body
+
+    first: Dict[str, Optional[int]] = {}
+    last: Dict[str, Optional[int]] = {}
+    for version, moves in log:
+        if version <= delta_from:
+            continue
+        for drv, old, new in moves:
+            first.setdefault(drv, old)
+            last[drv] = new
+
+    # [driver, old position, new position], in new position order
+    moves = [(drv, first[drv], pos) for drv, pos in last.items() if first[drv] != pos]
+    moves.sort(key=lambda m: (m[2] is None, m[2] or 0))
+
+    body = session.delta_bodies[delta_from] = _json_encoder.encode({
+        "status": "delta",
+        "race_id": session.race_id,
+        "session_type": session.session_type,
+        "from_version": delta_from,
+        "version": published.version,
+        "cursor": session.cursor(published.version),
+        "updated_at": published.updated_at,
+        "upstream_at": published.upstream_at,
+        "moves": moves,
+    })
+    return body
+
+
+@app.get("/positions")
+async def positions(
+    race_id: Optional[str] = Query(None, description="Session to serve; default the live one"),
+    since_version: Optional[str] = Query(None, description="Long-poll: wait until the order moves on from this cursor (or ETag)"),
+    timeout: float = Query(25.0, gt=0, description="Long-poll wait in seconds"),
+    delta_from: Optional[str] = Query(None, description="Only the moves since this cursor (or ETag), if still logged"),
+    if_none_match: Optional[str] = Header(default=None, alias="If-None-Match"),
+    accept_encoding: Optional[str] = Header(default=None, alias="Accept-Encoding"),
+):
+    # async def: a pointer read, not worth a threadpool hop, and parked
+    # long-polls cost a coroutine each rather than a thread
+    if since_version is not None:
+        await wait_for_new_version(race_id, since_version, min(timeout, POSITIONS_LONG_POLL_MAX_SECONDS))
+
+    session = get_session(race_id)
+    if session is None:
+        return Response(not_live_positions_body(None, race_id), media_type="application/json",
+                        headers={"Cache-Control": CACHE_CONTROL_UNAVAILABLE})
+
+    if delta_from is not None:
+        body = positions_delta_body(session, delta_from)
+        if body is not None:
+            return Response(body, media_type="application/json",
+                            headers={"Cache-Control": CACHE_CONTROL_LIVE})
+        # Another session's cursor, or too old to replay: send the full order
+
+    published = session.published
+    if published.order:
+        variants = published.variants if len(published.body) >= COMPRESS_MIN_BYTES else None
+        return negotiated_response(published.body, published.etag, variants, accept_encoding,
+                                   if_none_match, CACHE_CONTROL_LIVE)
+
+    # not_live: updated_at moves with the clock, so bodies are only weakly equal
+    headers = {"ETag": f'W/"{session.cursor(published.version)}"', "Cache-Control": CACHE_CONTROL_UNAVAILABLE}
+    if etag_matches(if_none_match, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    return Response(not_live_positions_body(session, race_id), media_type="application/json", headers=headers)
+
+
+# Comment line sent on an idle stream so proxies keep it open
+POSITIONS_STREAM_KEEPALIVE_SECONDS = 15.0
+
+
+async def position_events(race_id: Optional[str], last_event_id: Optional[str]):
+    """
+    SSE events for /positions/stream. Event ids are session cursors;
+    a client that reconnects with a Last-Event-ID still in the session's
+    buffer gets only the versions it missed, anyone else starts from the
+    current order. Without race_id the stream follows the live session
+    across session changes.
+    """
+    session = get_session(race_id)
+    sent = session.version_of(last_event_id)
+    if sent is None:
+        sent = -1
+
+    yield b"retry: 2000\n\n"
+    while True:
+        changed = session.changed()
+        published = session.published
+
+        if published.version != sent:
+            events = list(session.stream_events)
+            if 0 <= sent < published.version and events and events[0][0] <= sent + 1:
+                for version, event in events:
+                    if version > sent:
+                        yield event
+            elif events and events[-1][0] == published.version:
+                yield events[-1][1]
+            else:
+                body = published.body if published.order else not_live_positions_body(session, race_id)
+                yield sse_event(session.cursor(published.version), body)
+            sent = published.version
+
+        try:
+            async with asyncio.timeout(POSITIONS_STREAM_KEEPALIVE_SECONDS):
+                await changed.wait()
+        except TimeoutError:
+            yield b": keepalive\n\n"
+
+        # The live session changed, or race_id was re-opened
+        current = get_session(race_id)
+        if current is not None and current is not session:
+            session = current
+            sent = -1
+
+
+@app.get("/positions/stream")
+async def positions_stream(
+    race_id: Optional[str] = Query(None, description="Session to follow; default the live one"),
+    last_event_id: Optional[str] = Header(default=None, alias="Last-Event-ID"),
+):
+    if get_session(race_id) is None:
+        raise HTTPException(status_code=404, detail=f"Unknown race_id: {race_id}")
+
+    return StreamingResponse(
+        position_events(race_id, last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def parse_driver_filter(drivers: Optional[str], session: LiveSession) -> Optional[frozenset]:
+    """
+    "VER,HAM" or "1,44" -> app driver codes; None means everyone.
+    """
+    if not drivers:
+        return None
+    codes = set()
+    for d in drivers.split(","):
+        d = d.strip().upper()
+        if d:
+            codes.add(session.drivers.code(d) or normalize_driver_code(d))
+    return frozenset(codes) or None
+
+
+@app.websocket("/ws/positions")
+async def ws_positions(
+    websocket: WebSocket,
+    race_id: Optional[str] = None,
+    drivers: Optional[str] = None,
+):
+    session = get_session(race_id)
+    if session is None:
+        await websocket.close(code=1008, reason="Unknown race_id")
+        return
+
+    await websocket.accept()
+    race_id = canonical_race_id(race_id) if race_id else None
+    sub = _position_hub.subscribe(race_id, parse_driver_filter(drivers, session))
+
+    async def drain_incoming():
+        # Nothing is expected from the client; this just notices it leaving
+        try:
+            while (await websocket.receive())["type"] != "websocket.disconnect":
+                pass
+        finally:
+            sub.wake.set()
+
+    receiver = asyncio.create_task(drain_incoming())
+    try:
+        while True:
+            await sub.wake.wait()
+            sub.wake.clear()
+            if receiver.done():
+                break
+            if sub.dropped:
+                await websocket.close(code=1008, reason="Client too slow")
+                break
+            while sub.pending:
+                await websocket.send_text(sub.pending.popleft())
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        receiver.cancel()
+        _position_hub.unsubscribe(race_id, sub)
+
+
+@app.get("/telemetry/live")
+async def telemetry_live(
+    seconds: float = Query(10.0, gt=0, description="Window length in seconds"),
+    drivers: Optional[str] = Query(None, description="e.g. VER,HAM or 1,44"),
+    race_id: Optional[str] = Query(None, description="Session to serve; default the live one"),
+):
+    # async def: runs on the event loop, so it never sees a half-written batch
+    seconds = min(seconds, TELEMETRY_BUFFER_SECONDS)
+    session = get_session(race_id)
+
+    numbers = None
+    if drivers and session is not None:
+        wanted = {d.strip().upper() for d in drivers.split(",") if d.strip()}
+        numbers = [
+            n for n in range(MAX_RACING_NUMBER + 1)
+            if str(n) in wanted or session.drivers.code(n) in wanted
+        ]
+
+    window = session.telemetry.window(seconds, numbers) if session is not None else {}
+    if not window:
         return {
-            "status": "live",
-            "race_id": live_race_id,
+            "status": "not_live",
             "updated_at": utc_iso_now(),
-            "order": live_rows[:8],
+            "seconds": seconds,
+            "channels": [name for name, _ in TELEMETRY_CHANNELS],
+            "drivers": {},
         }
 
-    except Exception as e:
+    out = {}
+    for num, series in window.items():
+        code = session.drivers.code(num) or str(num)
+        out[code] = {"number": str(num), **series}
+
+    return {
+        "status": "live",
+        "updated_at": utc_iso_now(),
+        "latest_sample_at": utc_iso_from_ts(session.telemetry.latest_t),
+        "seconds": seconds,
+        "channels": [name for name, _ in TELEMETRY_CHANNELS],
+        "drivers": out,
+    }
+
+
+@app.get("/positions/history")
+async def positions_history(
+    since: float = Query(0.0, description="Unix time in seconds; only samples newer than this"),
+    race_id: Optional[str] = Query(None, description="Session to serve; default the live one"),
+):
+    session = get_session(race_id)
+    history = session.history if session is not None else None
+    idx = history.indices_since(since) if history is not None else np.arange(0)
+    if idx.size == 0:
         return {
-            "status": "error",
-            "race_id": live_race_id,
+            "status": "empty",
             "updated_at": utc_iso_now(),
-            "order": [],
-            "error": str(e),
+            "t": [],
+            "positions": {},
         }
 
+    block = history.pos[idx]
+    positions = {}
+    for drv, col in history.columns.items():
+        code = session.drivers.code(drv) or drv
+        positions[code] = [int(p) or None for p in block[:, col]]
 
-@app.get("/grid")
-def grid(race_id: str = Query(..., description="e.g. 2026-australian")):
+    return {
+        "status": "ok",
+        "updated_at": utc_iso_now(),
+        "t": history.t[idx].tolist(),
+        "positions": positions,
+    }
+
+
+def build_grid_payload(race_id: str) -> Dict[str, Any]:
     if race_id == SIM_RACE_ID:
         # For test race, use current simulated/default grid order
         try:
@@ -736,7 +3216,7 @@ def grid(race_id: str = Query(..., description="e.g. 2026-australian")):
         race_results = getattr(race_session, "results", None)
         race_grid = extract_grid_from_race_results(race_results)
 
-        if len(race_grid) > 0:
+        if len(race_grid) > 0 and has_grid_positions(race_results):
             return {
                 "status": "ok",
                 "grid_status": "final",
@@ -759,6 +3239,16 @@ def grid(race_id: str = Query(..., description="e.g. 2026-australian")):
                 "grid": quali_grid,
             }
 
+        # 3) No grid yet: the DRIVER_CODES order, which must not be cached as final
+        if len(race_grid) > 0:
+            return {
+                "status": "ok",
+                "grid_status": "provisional",
+                "race_id": race_id,
+                "updated_at": utc_iso_now(),
+                "grid": race_grid,
+            }
+
         return {
             "status": "not_available",
             "grid_status": "provisional",
@@ -778,8 +3268,16 @@ def grid(race_id: str = Query(..., description="e.g. 2026-australian")):
         }
 
 
-@app.get("/results")
-def results(race_id: str = Query(..., description="e.g. 2026-australian")):
+@app.get("/grid")
+def grid(
+    race_id: str = Query(..., description="e.g. 2026-australian"),
+    if_none_match: Optional[str] = Header(default=None, alias="If-None-Match"),
+    accept_encoding: Optional[str] = Header(default=None, alias="Accept-Encoding"),
+):
+    return cached_json_response("grid", race_id, build_grid_payload, if_none_match, accept_encoding)
+
+
+def build_results_payload(race_id: str) -> Dict[str, Any]:
     if race_id == SIM_RACE_ID:
         # Sim mode: if sim on, current order can be treated as current result preview,
         # but not an official finished result.
@@ -837,6 +3335,15 @@ def results(race_id: str = Query(..., description="e.g. 2026-australian")):
         }
 
 
+@app.get("/results")
+def results(
+    race_id: str = Query(..., description="e.g. 2026-australian"),
+    if_none_match: Optional[str] = Header(default=None, alias="If-None-Match"),
+    accept_encoding: Optional[str] = Header(default=None, alias="Accept-Encoding"),
+):
+    return cached_json_response("results", race_id, build_results_payload, if_none_match, accept_encoding)
+
+
 # --------------------------------------------------
 # Admin simulation endpoints
 # --------------------------------------------------
@@ -889,8 +3396,33 @@ def sim_reset(x_admin_token: Optional[str] = Header(default=None, alias="X-Admin
     return {"ok": True, "sim_on": _sim_on, "grid_size": len(_grid), "updated_at": utc_iso_now()}
 
 
-def start_background_ws():
-    t = threading.Thread(target=start_f1_live_timing, daemon=True)
-    t.start()
+# --------------------------------------------------
+# Admin live session endpoints
+# --------------------------------------------------
+@app.post("/live/replay")
+async def live_replay(
+    race_id: str = Query(..., description="Session to replay into, e.g. 2026-australia-replay"),
+    segment: Optional[str] = Query(None, description="Segment file in FRAME_LOG_DIR; default all"),
+    speed: float = Query(1.0, ge=0, description="1 = real time, N = N x, 0 = max"),
+    x_admin_token: Optional[str] = Header(default=None, alias="X-Admin-Token"),
+):
+    _require_admin_token(x_admin_token)
+
+    if not FRAME_LOG_DIR:
+        raise HTTPException(status_code=404, detail="FRAME_LOG_DIR not configured on server")
+
+    path = FRAME_LOG_DIR
+    if segment:
+        # Plain file names only; never read outside the frame log directory
+        if os.path.basename(segment) != segment:
+            raise HTTPException(status_code=400, detail="Invalid segment")
+        path = os.path.join(FRAME_LOG_DIR, segment)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Frame log not found")
+
+    try:
+        session = start_replay(race_id, path, speed)
+    except (ValueError, RuntimeError) as e:
+        raise HTTPException(status_code=409, detail=str(e))
 
-start_background_ws()
+    return {"ok": True, "race_id": session.race_id, "speed": speed, "updated_at": utc_iso_now()}
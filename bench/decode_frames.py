@@ -0,0 +1,163 @@
+"""
+Frame decoding micro-benchmark: the msgspec path in handle_live_message
+versus the previous json.loads + dict walking path.
+
+    python bench/decode_frames.py                  # synthetic race traffic
+    python bench/decode_frames.py /var/frames      # recorded frame log
+
+"decode" stubs out dispatch_topic to time envelope/topic decoding alone;
+"full" includes the handlers and position publishing. Allocation numbers
+are the mean per-frame tracemalloc peak (transient bytes) and the blocks
+still alive after the run.
+"""
+import argparse
+import base64
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+import zlib
+from typing import Callable, List
+
+os.environ.setdefault("LIVE_TIMING", "0")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import app  # noqa: E402
+from signalr_standin import RACING_NUMBERS  # noqa: E402
+
+
+def legacy_handle_live_message(message: str) -> bool:
+    """
+    handle_live_message as it was before the typed decoding layer.
+    """
+    try:
+        payload = json.loads(message)
+    except ValueError:
+        return False
+
+    if not isinstance(payload, dict):
+        return False
+
+    if "R" in payload and str(payload.get("I")) == "1":
+        if isinstance(payload["R"], dict):
+            for topic, data in payload["R"].items():
+                app.dispatch_topic(app.get_session(), topic, data, is_snapshot=True)
+        return True
+
+    if "M" not in payload:
+        return False
+
+    for msg in payload["M"]:
+        if msg.get("M") != "feed":
+            continue
+
+        args = msg.get("A")
+        if not args or len(args) < 2:
+            continue
+
+        app.dispatch_topic(app.get_session(), args[0], args[1])
+
+    return False
+
+
+def _z(obj) -> str:
+    c = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+    return base64.b64encode(c.compress(json.dumps(obj).encode()) + c.flush()).decode()
+
+
+def _feed(topic, data, n) -> str:
+    return json.dumps({"C": f"d-{n}", "M": [{"H": "Streaming", "M": "feed",
+                                             "A": [topic, data, "2026-03-08T05:00:00.123Z"]}]})
+
+
+def synthetic_frames(count: int) -> List[str]:
+    """
+    Roughly race-shaped traffic: mostly TimingData deltas with the usual
+    gap/sector noise, CarData.z batches, keepalives and unsubscribed topics.
+    """
+    rnd = random.Random(7)
+    order = RACING_NUMBERS[:]
+    frames = []
+    for n in range(count):
+        kind = rnd.random()
+        if kind < 0.6:
+            i = rnd.randrange(len(order) - 1)
+            order[i], order[i + 1] = order[i + 1], order[i]
+            lines = {
+                order[i]: {"Position": str(i + 1), "Line": i + 1, "GapToLeader": "+3.1",
+                           "IntervalToPositionAhead": {"Value": "+0.4"}},
+                order[i + 1]: {"Position": str(i + 2), "Line": i + 2,
+                               "Sectors": {"1": {"Value": "28.123", "PersonalFastest": False}}},
+            }
+            for drv in rnd.sample(order, 4):
+                lines.setdefault(drv, {"Speeds": {"I1": {"Value": "301"}}, "LastLapTime": {"Value": "1:21.345"}})
+            frames.append(_feed("TimingData", {"Lines": lines}, n))
+        elif kind < 0.75:
+            entries = [{"Utc": "2026-03-08T05:00:00.1234567Z",
+                        "Cars": {d: {"Channels": {"0": 11000, "2": 300, "3": 7, "4": 100, "5": 0, "45": 0}}
+                                 for d in order}} for _ in range(4)]
+            frames.append(_feed("CarData.z", _z({"Entries": entries}), n))
+        elif kind < 0.85:
+            frames.append(_feed("WeatherData", {"AirTemp": "21.3", "TrackTemp": "35.1"}, n))
+        elif kind < 0.95:
+            frames.append(_feed("Heartbeat", {"Utc": "2026-03-08T05:00:00.1234567Z"}, n))
+        else:
+            frames.append("{}")
+    return frames
+
+
+def measure(handler: Callable[[str], bool], frames: List[str], repeat: int) -> dict:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for f in frames:
+            handler(f)
+        best = min(best, time.perf_counter() - t0)
+
+    tracemalloc.start()
+    peaks = 0
+    base_blocks = sys.getallocatedblocks()
+    for f in frames:
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        handler(f)
+        peaks += tracemalloc.get_traced_memory()[1] - before
+    retained = sys.getallocatedblocks() - base_blocks
+    tracemalloc.stop()
+
+    return {
+        "frames_per_s": round(len(frames) / best),
+        "us_per_frame": round(best / len(frames) * 1e6, 2),
+        "transient_bytes_per_frame": round(peaks / len(frames)),
+        "retained_blocks": retained,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", nargs="?", help="recorded frame log (default: synthetic frames)")
+    parser.add_argument("--frames", type=int, default=20000, help="synthetic frame count")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    frames = [raw for _, raw in app.iter_frame_log(args.path)] if args.path else synthetic_frames(args.frames)
+
+    real_dispatch = app.dispatch_topic
+    results = {}
+    for mode in ("decode", "full"):
+        app.dispatch_topic = real_dispatch if mode == "full" else (lambda *a, **k: None)
+        for name, handler in (("json", legacy_handle_live_message), ("msgspec", app.handle_live_message)):
+            results[f"{mode}/{name}"] = measure(handler, frames, args.repeat)
+    app.dispatch_topic = real_dispatch
+
+    print(f"{len(frames)} frames")
+    print(f"{'':16} {'frames/s':>10} {'us/frame':>9} {'bytes/frame':>12} {'retained':>9}")
+    for key, r in results.items():
+        print(f"{key:16} {r['frames_per_s']:>10} {r['us_per_frame']:>9} "
+              f"{r['transient_bytes_per_frame']:>12} {r['retained_blocks']:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+End-to-end ingest latency: frame sent by the SignalR stand-in -> order
+visible in GET /positions.
+
+Starts the stand-in and the app (uvicorn, own thread and event loop, as in
+production) in one process, then steps the feed through increasing message
+rates while pollers hit /positions. Each synthetic frame sets a unique top-8
+order, so every new order a poller sees maps back to its send time.
+
+    python bench/e2e_latency.py --rates 10,50,200,1000 --seconds 10
+"""
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+from typing import Dict, List
+
+import aiohttp
+
+STANDIN_PORT = 8765
+APP_PORT = 8766
+
+os.environ["LIVE_TIMING"] = "1"
+os.environ["F1_LIVE_BASE_URL"] = f"http://127.0.0.1:{STANDIN_PORT}/signalr"
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import numpy as np  # noqa: E402
+import uvicorn  # noqa: E402
+
+import app  # noqa: E402
+from signalr_standin import StandIn, SyntheticTimingSource, start_standin  # noqa: E402
+
+
+def start_app_server(port: int) -> uvicorn.Server:
+    config = uvicorn.Config(app.app, host="127.0.0.1", port=port, log_level="warning", lifespan="on")
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, name="app-server", daemon=True).start()
+    return server
+
+
+async def poll(url: str, sent_at: Dict[tuple, float], seen: set, latencies: List[float],
+               stop: asyncio.Event) -> None:
+    async with aiohttp.ClientSession() as http:
+        while not stop.is_set():
+            async with http.get(url) as r:
+                body = await r.json()
+            now = time.perf_counter()
+            key = tuple(row["driver"] for row in body.get("order", []))
+            if key in seen:
+                continue
+            seen.add(key)
+            t_sent = sent_at.get(key)
+            if t_sent is not None:
+                latencies.append(now - t_sent)
+
+
+async def run(rates: List[float], seconds: float, pollers: int) -> None:
+    def code(num):
+        return app.get_session().drivers.code(num)
+
+    sent_at: Dict[tuple, float] = {}
+
+    def on_sent(top8, t):
+        sent_at[tuple(code(n) for n in top8)] = t
+
+    standin = StandIn(SyntheticTimingSource(), rate=0, on_sent=on_sent)
+    runner = await start_standin(standin, "127.0.0.1", STANDIN_PORT)
+    server = start_app_server(APP_PORT)
+
+    url = f"http://127.0.0.1:{APP_PORT}/positions"
+    async with aiohttp.ClientSession() as http:
+        for _ in range(100):
+            try:
+                async with http.get(url) as r:
+                    if (await r.json()).get("status") == "live":
+                        break
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.1)
+        else:
+            raise SystemExit("app never went live against the stand-in")
+
+    print(f"{'rate/s':>8} {'sent':>7} {'seen':>7} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for rate in rates:
+        sent_at.clear()
+        seen: set = set()
+        latencies: List[float] = []
+        sent_before = standin.sent
+
+        stop = asyncio.Event()
+        standin.rate = rate
+        tasks = [asyncio.create_task(poll(url, sent_at, seen, latencies, stop)) for _ in range(pollers)]
+        await asyncio.sleep(seconds)
+        stop.set()
+        standin.rate = 0
+        await asyncio.gather(*tasks)
+
+        ms = np.asarray(latencies) * 1e3
+        if ms.size:
+            p50, p99 = np.percentile(ms, [50, 99])
+            print(f"{rate:>8g} {standin.sent - sent_before:>7} {ms.size:>7} {p50:>8.2f} {p99:>8.2f} {ms.max():>8.2f}")
+        else:
+            print(f"{rate:>8g} {standin.sent - sent_before:>7} {0:>7} {'-':>8} {'-':>8} {'-':>8}")
+
+    server.should_exit = True
+    await runner.cleanup()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rates", default="10,50,200,1000", help="comma separated messages/s steps")
+    parser.add_argument("--seconds", type=float, default=10.0, help="duration of each step")
+    parser.add_argument("--pollers", type=int, default=4, help="concurrent /positions pollers")
+    args = parser.parse_args()
+
+    rates = [float(r) for r in args.rates.split(",") if r.strip()]
+    asyncio.run(run(rates, args.seconds, args.pollers))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""
+GET /positions throughput: pre-serialised bytes vs. the old per-request
+dict + FastAPI JSON encoding (re-created here as /bench/positions-legacy).
+
+Runs the app (LIVE_TIMING=0, uvicorn, one worker) in a child process with a
+seeded live session, optionally republishing the order --churn times per
+second, and drives each route with keep-alive clients from --procs load
+processes for --seconds.
+
+    python bench/positions_throughput.py --seconds 10 --connections 32 --procs 2
+"""
+import argparse
+import asyncio
+import itertools
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+import aiohttp
+
+APP_PORT = 8767
+
+os.environ["LIVE_TIMING"] = "0"
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+ROUTES = [("bytes", "/positions"), ("legacy", "/bench/positions-legacy")]
+
+
+def serve(port: int, churn: float) -> None:
+    import uvicorn
+
+    import app
+    from signalr_standin import SYNTHETIC_SESSION_INFO, SyntheticTimingSource
+
+    def legacy_utc_iso_now() -> str:
+        import datetime
+        return datetime.datetime.utcnow().replace(microsecond=0).isoformat() + "Z"
+
+    @app.app.get("/bench/positions-legacy")
+    def positions_legacy(race_id: Optional[str] = None):
+        session = app.get_session(race_id)
+        published = session.published
+        if published.order:
+            return {
+                "status": "live",
+                "race_id": session.race_id,
+                "session_type": session.session_type,
+                "version": published.version,
+                "updated_at": published.updated_at,
+                "upstream_at": published.upstream_at,
+                "order": published.order[:8],
+            }
+        return {
+            "status": "not_live",
+            "race_id": session.race_id,
+            "session_type": session.session_type,
+            "version": published.version,
+            "updated_at": legacy_utc_iso_now(),
+            "upstream_at": None,
+            "order": [],
+        }
+
+    source = SyntheticTimingSource()
+    session = app.route_live_session(SYNTHETIC_SESSION_INFO)
+    app.apply_timing_snapshot(session, source.snapshot()["TimingData"])
+
+    async def republish() -> None:
+        # Synthetic deltas straight into the session, as the ingest worker would
+        perms = itertools.cycle(itertools.permutations(source.numbers[:8]))
+        while True:
+            await asyncio.sleep(1.0 / churn)
+            top8 = next(perms)
+            lines = {num: {"Position": str(i + 1)} for i, num in enumerate(top8)}
+            app.process_timing_data(session, {"Lines": lines})
+
+    async def main() -> None:
+        config = uvicorn.Config(app.app, host="127.0.0.1", port=port, log_level="warning",
+                                access_log=False, lifespan="on")
+        server = uvicorn.Server(config)
+        task = asyncio.create_task(republish()) if churn > 0 else None
+        await server.serve()
+        if task is not None:
+            task.cancel()
+
+    asyncio.run(main())
+
+
+async def _load(url: str, connections: int, seconds: float) -> Dict[str, Any]:
+    latencies: List[float] = []
+    errors = 0
+    deadline = time.perf_counter() + seconds
+
+    async def client(http: aiohttp.ClientSession) -> None:
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            t0 = time.perf_counter()
+            try:
+                async with http.get(url) as r:
+                    await r.read()
+                    if r.status != 200:
+                        errors += 1
+                        continue
+            except aiohttp.ClientError:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - t0)
+
+    connector = aiohttp.TCPConnector(limit=connections)
+    async with aiohttp.ClientSession(connector=connector) as http:
+        await asyncio.gather(*(client(http) for _ in range(connections)))
+    return {"latencies": latencies, "errors": errors}
+
+
+def load_process(url: str, connections: int, seconds: float, out) -> None:
+    out.put(asyncio.run(_load(url, connections, seconds)))
+
+
+def run_route(url: str, connections: int, procs: int, seconds: float) -> Dict[str, Any]:
+    import numpy as np
+
+    out: "multiprocessing.Queue" = multiprocessing.Queue()
+    workers = [
+        multiprocessing.Process(target=load_process, args=(url, connections, seconds, out))
+        for _ in range(procs)
+    ]
+    for w in workers:
+        w.start()
+    results = [out.get() for _ in workers]
+    for w in workers:
+        w.join()
+
+    ms = np.asarray([t for r in results for t in r["latencies"]]) * 1e3
+    p50, p99 = np.percentile(ms, [50, 99]) if ms.size else (float("nan"), float("nan"))
+    return {
+        "requests": int(ms.size),
+        "errors": sum(r["errors"] for r in results),
+        "rps": ms.size / seconds,
+        "p50_ms": p50,
+        "p99_ms": p99,
+    }
+
+
+def wait_for(url: str, timeout: float = 20.0) -> None:
+    async def probe() -> None:
+        async with aiohttp.ClientSession() as http:
+            deadline = time.monotonic() + timeout
+            while time.monotonic() < deadline:
+                try:
+                    async with http.get(url) as r:
+                        if r.status == 200:
+                            return
+                except aiohttp.ClientError:
+                    pass
+                await asyncio.sleep(0.1)
+        raise SystemExit("app did not start")
+
+    asyncio.run(probe())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=10.0, help="duration per route")
+    parser.add_argument("--connections", type=int, default=32, help="keep-alive connections per load process")
+    parser.add_argument("--procs", type=int, default=2, help="load generator processes")
+    parser.add_argument("--churn", type=float, default=0.0, help="order republishes per second while loading")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, default=APP_PORT)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.port, args.churn)
+        return
+
+    server = subprocess.Popen([
+        sys.executable, os.path.abspath(__file__), "--serve",
+        "--port", str(args.port), "--churn", str(args.churn),
+    ])
+    try:
+        base = f"http://127.0.0.1:{args.port}"
+        wait_for(base + "/health")
+
+        print(f"{'route':>8} {'requests':>9} {'errors':>7} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8}")
+        for name, path in ROUTES:
+            r = run_route(base + path, args.connections, args.procs, args.seconds)
+            print(f"{name:>8} {r['requests']:>9} {r['errors']:>7} {r['rps']:>9.0f} "
+                  f"{r['p50_ms']:>8.2f} {r['p99_ms']:>8.2f}")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
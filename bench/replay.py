@@ -0,0 +1,34 @@
+"""
+Replay a recorded frame log (FRAME_LOG_DIR) through the ingest path.
+
+    python bench/replay.py /var/frames --speed 0      # as fast as possible
+    python bench/replay.py /var/frames --speed 10     # 10x real time
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+os.environ.setdefault("LIVE_TIMING", "0")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import app  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="frame log segment or directory of segments")
+    parser.add_argument("--speed", type=float, default=0.0, help="1 = real time, N = N x, 0 = max (default)")
+    parser.add_argument("--race-id", default="replay", help="session to replay into (default: replay)")
+    args = parser.parse_args()
+
+    session = app.open_session(args.race_id, source="replay")
+    report = asyncio.run(app.replay_frames(app.iter_frame_log(args.path), speed=args.speed, session=session))
+    report["topics"] = session.snapshot()["topics"]
+    report["final_order"] = session.published.order[:8]
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+"""
+Local stand-in for the F1 live timing SignalR endpoint.
+
+Implements /signalr/negotiate and the /signalr/connect websocket, answers the
+Subscribe call with a snapshot (R) and then pushes feed messages at a fixed
+rate: synthetic TimingData orders, or frames from a recorded log.
+/signalr/reconnect resumes a dropped connection from its messageId cursor,
+replaying buffered frames, or refuses (400) once the cursor has aged out.
+
+    python bench/signalr_standin.py --port 8765 --rate 50
+    python bench/signalr_standin.py --port 8765 --rate 200 --log /var/frames
+
+Run the app against it with
+    F1_LIVE_BASE_URL=http://127.0.0.1:8765/signalr uvicorn app:app
+"""
+import argparse
+import asyncio
+import collections
+import itertools
+import json
+import os
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from aiohttp import web, WSMsgType
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+RACING_NUMBERS = [
+    "1", "4", "16", "44", "63", "81", "12", "14", "5", "10", "11",
+    "18", "23", "27", "30", "31", "43", "55", "77", "87", "6", "41",
+]
+
+SYNTHETIC_SESSION_INFO = {
+    "Meeting": {"Key": 1279, "Name": "Australian Grand Prix", "Location": "Melbourne"},
+    "Key": 10000,
+    "Type": "Race",
+    "Name": "Race",
+    "StartDate": "2026-03-08T15:00:00",
+    "Path": "2026/2026-03-08_Australian_Grand_Prix/2026-03-08_Race/",
+}
+
+KEEPALIVE_SECONDS = 10.0
+RESUME_BUFFER_FRAMES = 2000
+
+
+def feed_frame(topic: str, data: Any, cursor: int) -> str:
+    ts = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime()) + f".{int(time.time() % 1 * 1e6):06d}Z"
+    return json.dumps({
+        "C": f"d-{cursor}",
+        "M": [{"H": "Streaming", "M": "feed", "A": [topic, data, ts]}],
+    }, separators=(",", ":"))
+
+
+class SyntheticTimingSource:
+    """
+    Every frame is a TimingData delta that sets the top 8 to the next
+    permutation of the first eight cars, so each order seen on /positions
+    identifies exactly one sent frame (8! = 40320 before repeating).
+    """
+
+    def __init__(self, numbers: List[str] = RACING_NUMBERS):
+        self.numbers = numbers
+        self._perms = itertools.cycle(itertools.permutations(numbers[:8]))
+
+    def snapshot(self) -> Dict[str, Any]:
+        lines = {num: {"Position": str(i + 1), "Line": i + 1} for i, num in enumerate(self.numbers)}
+        return {"SessionInfo": SYNTHETIC_SESSION_INFO, "TimingData": {"Lines": lines}}
+
+    def next_frame(self, cursor: int) -> Tuple[str, Optional[tuple]]:
+        top8 = next(self._perms)
+        lines = {num: {"Position": str(i + 1), "Line": i + 1} for i, num in enumerate(top8)}
+        return feed_frame("TimingData", {"Lines": lines}, cursor), top8
+
+
+def with_cursor(frame: str, cursor: int) -> str:
+    """
+    Recorded frames carry the cursor of the original session; restamp them.
+    """
+    if frame.startswith('{"C":"'):
+        end = frame.find('"', 6)
+        return f'{{"C":"d-{cursor}"' + frame[end + 1:]
+    return frame
+
+
+class RecordedSource:
+    """
+    Replays a FRAME_LOG_DIR recording: its Subscribe response becomes the
+    snapshot and the remaining frames are pushed verbatim, looping at the end.
+    """
+
+    def __init__(self, path: str):
+        import app
+
+        self._snapshot: Dict[str, Any] = {}
+        self._frames: List[str] = []
+        for _, raw in app.iter_frame_log(path):
+            if not self._snapshot and '"R"' in raw:
+                payload = json.loads(raw)
+                if isinstance(payload.get("R"), dict):
+                    self._snapshot = payload["R"]
+                    continue
+            self._frames.append(raw)
+
+        if not self._frames:
+            raise SystemExit(f"No frames in {path}")
+        self._iter = itertools.cycle(self._frames)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return self._snapshot
+
+    def next_frame(self, cursor: int) -> Tuple[str, Optional[tuple]]:
+        return with_cursor(next(self._iter), cursor), None
+
+
+class StandIn:
+    def __init__(self, source, rate: float,
+                 on_sent: Optional[Callable[[Optional[tuple], float], None]] = None):
+        self.source = source
+        self.rate = rate
+        self.on_sent = on_sent
+        self.connections = 0
+        self.sent = 0
+        self.resumes = 0
+        self.cursor = 0
+        self._sockets: set = set()
+        self._recent: "collections.deque" = collections.deque(maxlen=RESUME_BUFFER_FRAMES)
+
+    async def negotiate(self, request: web.Request) -> web.Response:
+        self.connections += 1
+        return web.json_response({
+            "Url": "/signalr",
+            "ConnectionToken": f"standin+token/{self.connections}==",
+            "ConnectionId": f"standin-{self.connections}",
+            "KeepAliveTimeout": 20.0,
+            "DisconnectTimeout": 30.0,
+            "TryWebSockets": True,
+            "ProtocolVersion": "1.5",
+        })
+
+    async def connect(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        await ws.send_str(json.dumps({"C": "init", "S": 1, "M": []}))
+
+        # Wait for the hub Subscribe invocation
+        invocation_id = "1"
+        async for msg in ws:
+            if msg.type != WSMsgType.TEXT:
+                return ws
+            call = json.loads(msg.data)
+            if call.get("M") == "Subscribe":
+                invocation_id = str(call.get("I", 1))
+                break
+
+        await ws.send_str(json.dumps({"R": self.source.snapshot(), "I": invocation_id}))
+        await self._push(ws)
+        return ws
+
+    async def reconnect(self, request: web.Request) -> web.StreamResponse:
+        message_id = request.query.get("messageId", "")
+        try:
+            since = int(message_id.rsplit("-", 1)[-1])
+        except ValueError:
+            return web.Response(status=400, text="bad messageId")
+
+        if not self._recent or since < self._recent[0][0] - 1:
+            return web.Response(status=400, text="messageId no longer available")
+
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.resumes += 1
+        for cursor, frame in list(self._recent):
+            if cursor > since:
+                await ws.send_str(frame)
+        await self._push(ws)
+        return ws
+
+    async def drop(self) -> None:
+        """
+        Close every open client socket (simulates a network blip).
+        """
+        for ws in list(self._sockets):
+            await ws.close()
+
+    async def _push(self, ws: web.WebSocketResponse) -> None:
+        self._sockets.add(ws)
+        try:
+            await self._push_loop(ws)
+        finally:
+            self._sockets.discard(ws)
+
+    async def _push_loop(self, ws: web.WebSocketResponse) -> None:
+        loop = asyncio.get_running_loop()
+        next_at = loop.time()
+        last_sent = next_at
+        while not ws.closed:
+            if self.rate <= 0:
+                await asyncio.sleep(0.1)
+                if loop.time() - last_sent >= KEEPALIVE_SECONDS:
+                    try:
+                        await ws.send_str("{}")
+                    except ConnectionResetError:
+                        break
+                    last_sent = loop.time()
+                next_at = loop.time()
+                continue
+
+            self.cursor += 1
+            frame, key = self.source.next_frame(self.cursor)
+            self._recent.append((self.cursor, frame))
+            try:
+                await ws.send_str(frame)
+            except ConnectionResetError:
+                break
+            self.sent += 1
+            if self.on_sent is not None:
+                self.on_sent(key, time.perf_counter())
+
+            last_sent = loop.time()
+            next_at += 1.0 / self.rate
+            delay = next_at - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            elif delay < -1.0:
+                next_at = loop.time()  # fell behind; do not burst to catch up
+
+    def make_app(self) -> web.Application:
+        web_app = web.Application()
+        web_app.router.add_get("/signalr/negotiate", self.negotiate)
+        web_app.router.add_get("/signalr/connect", self.connect)
+        web_app.router.add_get("/signalr/reconnect", self.reconnect)
+        return web_app
+
+
+async def start_standin(standin: StandIn, host: str, port: int) -> web.AppRunner:
+    runner = web.AppRunner(standin.make_app())
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--rate", type=float, default=20.0, help="feed messages per second")
+    parser.add_argument("--log", help="recorded frame log to push instead of synthetic frames")
+    args = parser.parse_args()
+
+    source = RecordedSource(args.log) if args.log else SyntheticTimingSource()
+    standin = StandIn(source, args.rate)
+
+    async def run() -> None:
+        await start_standin(standin, args.host, args.port)
+        print(f"SignalR stand-in on http://{args.host}:{args.port}/signalr at {args.rate} msg/s")
+        while True:
+            await asyncio.sleep(3600)
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()